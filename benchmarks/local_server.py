@@ -0,0 +1,144 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from threading import Lock, Thread
+from urllib.parse import parse_qs, urlsplit
+import hashlib
+import os
+import random
+import time
+
+PATH_TO_FIXTURES = Path(os.path.dirname(__file__)) / "fixtures"
+
+
+def synthetic_jpg(name: str, size: int) -> bytes:
+    """
+    Deterministic bytes that look like a JPEG (SOI and EOI markers) for a given
+    image name, so repeated runs download identical content.
+    """
+    seed = hashlib.sha256(name.encode()).digest()
+    body = (seed * (size // len(seed) + 1))[:max(size - 4, 0)]
+    return b"\xff\xd8" + body + b"\xff\xd9"
+
+
+class BenchmarkServer:
+    """
+    A local stand-in for both the Redbubble search pages and its image CDN.
+
+    GET /shop/?query=...&page=N serves the recorded search results fixture for
+    pages 1..pages, and an empty results page after that.
+    GET /images/<name>.jpg serves a synthetic JPG of image_size bytes.
+
+    Every response can be delayed (latency +/- jitter seconds), throttled to
+    bandwidth bytes per second, and replaced by a 503 with probability error_rate.
+    """
+
+    def __init__(
+            self,
+            latency: float = 0.0,
+            jitter: float = 0.0,
+            error_rate: float = 0.0,
+            bandwidth: int | None = None,
+            image_size: int = 100_000,
+            pages: int = 3,
+            seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.bandwidth = bandwidth
+        self.image_size = image_size
+        self.pages = pages
+        self.random = random.Random(seed)
+        self.search_page = (PATH_TO_FIXTURES / "search_results_page.html").read_text()
+        self.empty_page = (PATH_TO_FIXTURES / "search_results_empty.html").read_text()
+        self.lock = Lock()
+        self.connections = 0
+        self.requests = 0
+        self.errors = 0
+        self.bytes_sent = 0
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.thread = Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def __enter__(self) -> "BenchmarkServer":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _draw(self) -> tuple[float, bool]:
+        """
+        Draw this request's delay and whether it should fail.
+        """
+        with self.lock:
+            self.requests += 1
+            delay = max(self.latency + self.random.uniform(-self.jitter, self.jitter), 0.0)
+            fail = self.random.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        return delay, fail
+
+    def render_search_page(self, query: str, page: int) -> bytes:
+        if page > self.pages:
+            return self.empty_page.encode()
+        return (self.search_page
+                .replace("{base_url}", self.base_url)
+                .replace("{page}", str(page))
+                .replace("{next_page}", str(page + 1))
+                .replace("{query}", query)).encode()
+
+    def _handler_class(self) -> type[BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                with server.lock:
+                    server.connections += 1
+                super().setup()
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                delay, fail = server._draw()
+                time.sleep(delay)
+                url = urlsplit(self.path)
+                if fail:
+                    return self._send(503, b"", "text/plain", {"Retry-After": "0"})
+                if url.path.startswith("/shop"):
+                    query = parse_qs(url.query)
+                    body = server.render_search_page(
+                        query.get("query", [""])[0], int(query.get("page", ["1"])[0]))
+                    return self._send(200, body, "text/html; charset=utf-8")
+                if url.path.startswith("/images/") and url.path.endswith(".jpg"):
+                    body = synthetic_jpg(url.path, server.image_size)
+                    etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+                    if self.headers.get("If-None-Match") == etag:
+                        return self._send(304, b"", "image/jpeg", {"ETag": etag})
+                    return self._send(200, body, "image/jpeg", {"ETag": etag})
+                return self._send(404, b"", "text/plain")
+
+            def _send(self, status: int, body: bytes, content_type: str, headers: dict | None = None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                chunk_size = 16_384
+                for start in range(0, len(body), chunk_size):
+                    chunk = body[start:start + chunk_size]
+                    self.wfile.write(chunk)
+                    if server.bandwidth:
+                        time.sleep(len(chunk) / server.bandwidth)
+                with server.lock:
+                    server.bytes_sent += len(body)
+
+        return Handler
@@ -0,0 +1,443 @@
+"""
+Offline benchmarks for the scraper and downloader.
+
+Everything runs against benchmarks.local_server, so no network access is needed.
+Run from the repository root with:
+
+    python -m benchmarks.run_benchmarks
+
+Each run prints a table and appends one JSON line, tagged with the current git
+commit, to benchmarks/results.jsonl so results can be compared across commits.
+"""
+from pathlib import Path
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import resource
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+from redbubble_scrape import download_images, http_scraper
+from redbubble_scrape.checkpoint import ScrapeCheckpoint
+from redbubble_scrape.config import SETTINGS
+from redbubble_scrape.disk_writer import DiskWriter
+from redbubble_scrape.download_images import DownloadImages
+from redbubble_scrape.http_scraper import HttpScrapeRedbubble, parse_search_results_page
+from redbubble_scrape.metrics import METRICS
+from redbubble_scrape.near_duplicates import MultiIndexHash
+from redbubble_scrape.schemas import ImageMetadata, ImageRecord, ScraperResults
+
+from .local_server import PATH_TO_FIXTURES, BenchmarkServer
+
+PATH_TO_RESULTS = Path(os.path.dirname(__file__)) / "results.jsonl"
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """
+    Nearest rank percentile, 0.0 for no values.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(math.ceil(pct / 100 * len(ordered)) - 1, 0)]
+
+
+def summarize(latencies: list[float], items: int, seconds: float, peak_bytes: int) -> dict:
+    return {
+        "items": items,
+        "seconds": round(seconds, 4),
+        "items_per_second": round(items / seconds, 2) if seconds else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "peak_python_memory_mb": round(peak_bytes / 1_000_000, 3),
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_parse_fixture(repeat: int) -> dict:
+    """
+    Parse the recorded search results page repeatedly with the HTTP backend's parser.
+    """
+    html = (PATH_TO_FIXTURES / "search_results_page.html").read_text()
+
+    def parse_page():
+        return [HttpScrapeRedbubble.parse_tile(tile) for tile in parse_search_results_page(html)]
+
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        page_start = time.perf_counter()
+        parse_page()
+        latencies.append(time.perf_counter() - page_start)
+    seconds = time.perf_counter() - start
+    # tracemalloc slows parsing down a lot, so memory is measured on a separate pass
+    tracemalloc.start()
+    parse_page()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return summarize(latencies, repeat, seconds, peak)
+
+
+def bench_metadata_records(count: int) -> dict:
+    """
+    Build count images' metadata the old way (a dict per tile, validated into
+    ImageMetadata models) and as ImageRecords, comparing time and memory per item.
+    """
+    tiles = [
+        (f"Poster Design {index}", f"https://ih1.redbubble.net/image.{index}.jpg",
+         f"${10 + index % 40}.99", f"by author {index % 500}")
+        for index in range(count)]
+
+    def build_models() -> list:
+        return [
+            ImageMetadata(**{"title": title, "url": url, "price": price, "author": author})
+            for title, url, price, author in tiles]
+
+    def build_records() -> list:
+        return [ImageRecord.from_scraped(title, url, price, author) for title, url, price, author in tiles]
+
+    results = {}
+    for name, build in (("pydantic_models", build_models), ("slots_records", build_records)):
+        start = time.perf_counter()
+        build()
+        seconds = time.perf_counter() - start
+        # As in bench_parse_fixture, memory is measured on a separate pass
+        tracemalloc.start()
+        items = build()
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del items
+        results[name] = {
+            "items": count,
+            "seconds": round(seconds, 4),
+            "microseconds_per_item": round(seconds / count * 1_000_000, 3),
+            "bytes_per_item": round(current / count, 1),
+        }
+    return results
+
+
+def bench_near_duplicate_index(size: int, queries: int, max_distance: int) -> dict:
+    """
+    Build a multi-index hash table of size random 64 bit hashes, then time nearest lookups for
+    hashes a few bits away from stored ones (hits) and for fresh random hashes (misses).
+    """
+    generator = random.Random(0)
+    hashes = [generator.getrandbits(64) for _ in range(size)]
+    table = MultiIndexHash()
+    start = time.perf_counter()
+    for index, perceptual_hash in enumerate(hashes):
+        table.add(perceptual_hash, index)
+    build_seconds = time.perf_counter() - start
+
+    results = {"size": size, "build_seconds": round(build_seconds, 4)}
+    for name in ("hits", "misses"):
+        latencies = []
+        for _ in range(queries):
+            if name == "hits":
+                query = generator.choice(hashes)
+                for bit in generator.sample(range(64), max_distance // 2):
+                    query ^= 1 << bit
+            else:
+                query = generator.getrandbits(64)
+            lookup_start = time.perf_counter()
+            table.nearest(query, max_distance)
+            latencies.append(time.perf_counter() - lookup_start)
+        results[f"{name}_p50_ms"] = round(percentile(latencies, 50) * 1000, 3)
+        results[f"{name}_p99_ms"] = round(percentile(latencies, 99) * 1000, 3)
+    return results
+
+
+def bench_http_scrape(server: BenchmarkServer, search_terms: int, max_items: int) -> dict:
+    """
+    Run the HTTP scraper backend end to end against the local search pages.
+    """
+    http_scraper.SEARCH_URL = f"{server.base_url}/shop/"
+    # Keep the results in memory only, rather than writing them into the repository
+    results_format = SETTINGS.RESULTS_FORMAT
+    SETTINGS.RESULTS_FORMAT = "json"
+    write_results_to_json = HttpScrapeRedbubble.write_results_to_json
+    HttpScrapeRedbubble.write_results_to_json = staticmethod(lambda scrape_results: None)
+    # and the checkpoint log in a temporary folder
+    checkpoint_folder = tempfile.TemporaryDirectory()
+    open_checkpoint = HttpScrapeRedbubble.open_checkpoint
+    HttpScrapeRedbubble.open_checkpoint = staticmethod(lambda: (
+        ScrapeCheckpoint(Path(checkpoint_folder.name) / "scrape_checkpoint.jsonl"), {}))
+    page_times = []
+    fetch_page = HttpScrapeRedbubble._fetch_page
+
+    async def timed_fetch_page(self, page: int) -> str:
+        page_start = time.perf_counter()
+        try:
+            return await fetch_page(self, page)
+        finally:
+            page_times.append(time.perf_counter() - page_start)
+
+    HttpScrapeRedbubble._fetch_page = timed_fetch_page
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        results = HttpScrapeRedbubble.scrape_images(
+            [f"benchmark term {index}" for index in range(search_terms)], max_items)
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        HttpScrapeRedbubble._fetch_page = fetch_page
+        HttpScrapeRedbubble.write_results_to_json = write_results_to_json
+        HttpScrapeRedbubble.open_checkpoint = open_checkpoint
+        checkpoint_folder.cleanup()
+        SETTINGS.RESULTS_FORMAT = results_format
+    summary = summarize(page_times, len(page_times), seconds, peak)
+    summary["images_found"] = sum(len(items) for items in results.values())
+    return summary
+
+
+def bench_selenium_extraction(server: BenchmarkServer) -> dict:
+    """
+    Time ScrapeRedbubble's page extraction on the fixture in a headless Chrome,
+    with and without the bulk execute_script path. Skipped if no browser is available.
+    """
+    try:
+        from selenium import webdriver
+        from redbubble_scrape.redbubble_scraper import ScrapeRedbubble
+        options = webdriver.ChromeOptions()
+        options.add_argument("--headless=new")
+        driver = webdriver.Chrome(options=options)
+    except Exception as exc:
+        return {"skipped": f"{type(exc).__name__}: {exc}".splitlines()[0]}
+
+    results = {}
+    use_bulk_dom_extraction = SETTINGS.USE_BULK_DOM_EXTRACTION
+    try:
+        for bulk in (True, False):
+            SETTINGS.USE_BULK_DOM_EXTRACTION = bulk
+            latencies = []
+            start = time.perf_counter()
+            for page in range(1, server.pages + 1):
+                driver.get(f"{server.base_url}/shop/?query=benchmark&page={page}")
+                scraper = ScrapeRedbubble(
+                    search_input="benchmark", search_size_max=10 ** 6, driver=driver)
+                page_start = time.perf_counter()
+                scraper._scrape_current_page_metadata()
+                latencies.append(time.perf_counter() - page_start)
+            results["bulk" if bulk else "per_element"] = summarize(
+                latencies, len(latencies), time.perf_counter() - start, 0)
+    finally:
+        SETTINGS.USE_BULK_DOM_EXTRACTION = use_bulk_dom_extraction
+        driver.quit()
+    return results
+
+
+def bench_disk_writer(files: int, size: int, concurrency: int) -> dict:
+    """
+    Write files of size bytes, in 64 KB chunks and concurrency at a time, into a temporary
+    folder: once with a thread hop per open, chunk and close (as aiofiles does), then through
+    DiskWriter without and with batched fsync.
+    """
+    chunk_size = 65_536
+    chunks = [os.urandom(min(chunk_size, size - start)) for start in range(0, size, chunk_size)]
+
+    async def per_chunk(path: Path):
+        file = await asyncio.to_thread(open, path, "wb")
+        for chunk in chunks:
+            await asyncio.to_thread(file.write, chunk)
+        await asyncio.to_thread(file.close)
+
+    async def write_all(write_file, folder: Path) -> list[float]:
+        latencies = []
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def timed(index: int):
+            async with semaphore:
+                start = time.perf_counter()
+                await write_file(folder / f"{index}.jpg")
+                latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(timed(index) for index in range(files)))
+        return latencies
+
+    async def run(name: str, folder: Path) -> dict:
+        disk_writer = None
+        if name == "per_chunk_threads":
+            write_file = per_chunk
+        else:
+            disk_writer = DiskWriter(
+                threads=SETTINGS.DISK_WRITER_THREADS,
+                buffer_size=SETTINGS.WRITE_BUFFER_SIZE,
+                fsync_batch_size=SETTINGS.FSYNC_BATCH_SIZE if name == "disk_writer_fsync" else 0)
+
+            async def write_file(path: Path):
+                file = disk_writer.open(path)
+                for chunk in chunks:
+                    await file.write(chunk)
+                await file.close()
+                await disk_writer.sync_later(path)
+
+        start = time.perf_counter()
+        try:
+            latencies = await write_all(write_file, folder)
+        finally:
+            if disk_writer:
+                await disk_writer.close()
+        seconds = time.perf_counter() - start
+        summary = summarize(latencies, files, seconds, 0)
+        del summary["peak_python_memory_mb"]
+        summary["megabytes_per_second"] = round(files * size / seconds / 1_000_000, 3)
+        return summary
+
+    results = {}
+    for name in ("per_chunk_threads", "disk_writer", "disk_writer_fsync"):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            results[name] = asyncio.run(run(name, Path(temp_dir)))
+    return results
+
+
+class TimedDownloadImages(DownloadImages):
+    """
+    DownloadImages, recording how long each image took from dequeue to link.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latencies: list[float] = []
+
+    async def _request_and_download_image(self, dir_to_write_to, image_metadata):
+        start = time.perf_counter()
+        try:
+            await super()._request_and_download_image(dir_to_write_to, image_metadata)
+        finally:
+            self.latencies.append(time.perf_counter() - start)
+
+
+def bench_download(server: BenchmarkServer, images: int, concurrency: int) -> dict:
+    """
+    Run DownloadImages.download_files against the local CDN, writing into a temporary folder.
+    """
+    scrape_results = ScraperResults(results={
+        f"benchmark term {term}": [
+            {
+                "title": f"Benchmark Image {index}",
+                "url": f"{server.base_url}/images/c{concurrency}-{index}.jpg",
+                "price": "$19.99",
+                "author": f"by author {index % 7}",
+            }
+            for index in range(term, images, 4)]
+        for term in range(4)})
+
+    saved_paths = download_images.PATH_TO_IMAGE_FOLDER, download_images.PATH_TO_BLOB_FOLDER
+    use_download_manifest = SETTINGS.USE_DOWNLOAD_MANIFEST
+    persist_failed_downloads = SETTINGS.PERSIST_FAILED_DOWNLOADS
+    connections_before = server.connections
+    retries_before = METRICS.counters.get("download_retries_total", 0)
+    failures_before = METRICS.counters.get("download_failures_total", 0)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        download_images.PATH_TO_IMAGE_FOLDER = Path(temp_dir)
+        download_images.PATH_TO_BLOB_FOLDER = Path(temp_dir) / ".blobs"
+        SETTINGS.USE_DOWNLOAD_MANIFEST = False
+        SETTINGS.PERSIST_FAILED_DOWNLOADS = False
+        downloader = TimedDownloadImages(scrape_results=scrape_results, batch_size=concurrency)
+        tracemalloc.start()
+        try:
+            start = time.perf_counter()
+            asyncio.run(downloader.download_files())
+            seconds = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            download_images.PATH_TO_IMAGE_FOLDER, download_images.PATH_TO_BLOB_FOLDER = saved_paths
+            SETTINGS.USE_DOWNLOAD_MANIFEST = use_download_manifest
+            SETTINGS.PERSIST_FAILED_DOWNLOADS = persist_failed_downloads
+
+    summary = summarize(downloader.latencies, images, seconds, peak)
+    summary["megabytes_per_second"] = round(images * server.image_size / seconds / 1_000_000, 3)
+    summary["connections_opened"] = server.connections - connections_before
+    summary["retries"] = METRICS.counters.get("download_retries_total", 0) - retries_before
+    summary["failures"] = METRICS.counters.get("download_failures_total", 0) - failures_before
+    return summary
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--images", type=int, default=200, help="images per download benchmark")
+    parser.add_argument("--image-kb", type=int, default=100, help="size of each synthetic image")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[5, 20],
+                        help="BATCH_SIZE values to run the download benchmark at")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="mean added latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="+/- jitter on the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--bandwidth-kbps", type=int, default=0,
+                        help="per response bandwidth cap in KB/s, 0 for unlimited")
+    parser.add_argument("--max-connections-per-host", type=int, default=0,
+                        help="override MAX_CONNECTIONS_PER_HOST, 0 to use the configured value")
+    parser.add_argument("--pages", type=int, default=3, help="result pages per search term")
+    parser.add_argument("--search-terms", type=int, default=4, help="search terms for the HTTP scrape")
+    parser.add_argument("--parse-repeat", type=int, default=200, help="fixture parses to time")
+    parser.add_argument("--records", type=int, default=100_000,
+                        help="image metadata records to build in the records benchmark")
+    parser.add_argument("--index-size", type=int, default=100_000,
+                        help="hashes in the near-duplicate index benchmark")
+    parser.add_argument("--disk-files", type=int, default=500, help="files to write in the disk writer benchmark")
+    parser.add_argument("--selenium", action="store_true", help="also benchmark Selenium extraction")
+    parser.add_argument("--no-save", action="store_true", help=f"do not append to {PATH_TO_RESULTS.name}")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.max_connections_per_host:
+        SETTINGS.MAX_CONNECTIONS_PER_HOST = args.max_connections_per_host
+    server = BenchmarkServer(
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        error_rate=args.error_rate,
+        bandwidth=args.bandwidth_kbps * 1000 or None,
+        image_size=args.image_kb * 1000,
+        pages=args.pages)
+
+    results = {
+        "parse_fixture": bench_parse_fixture(args.parse_repeat),
+        "metadata_records": bench_metadata_records(args.records),
+        "near_duplicate_index": bench_near_duplicate_index(
+            args.index_size, 200, SETTINGS.NEAR_DUPLICATE_DISTANCE),
+        "disk_writer": bench_disk_writer(args.disk_files, args.image_kb * 1000, max(args.concurrency)),
+    }
+    with server:
+        results["http_scrape"] = bench_http_scrape(server, args.search_terms, 10 ** 6)
+        if args.selenium:
+            results["selenium_extraction"] = bench_selenium_extraction(server)
+        for concurrency in args.concurrency:
+            results[f"download_concurrency_{concurrency}"] = bench_download(
+                server, args.images, concurrency)
+    peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    print("-" * 75)
+    for name, summary in results.items():
+        print(f"{name}: {json.dumps(summary)}")
+    print(f"peak process RSS: {peak_rss_kb / 1000:.1f} MB")
+
+    if not args.no_save:
+        with open(PATH_TO_RESULTS, "a") as file:
+            file.write(json.dumps({
+                "commit": git_commit(),
+                "timestamp": time.time(),
+                "params": vars(args),
+                "peak_rss_kb": peak_rss_kb,
+                "results": results,
+            }) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,8 @@
-from .main import main
-import asyncio
+from .cli import cli
 
 """
 Allows the Scraper to be run by running the module instead.
+See cli.py for the subcommands.
 """
 if __name__ == "__main__":
-    asyncio.run(main())
+    cli()
@@ -0,0 +1,65 @@
+from pathlib import Path
+from threading import Lock
+import json
+import os
+
+from .schemas import ImageRecord, TermProgress
+
+PATH_TO_CHECKPOINT = Path(os.path.dirname(__file__)) / ".." / "scrape_checkpoint.jsonl"
+
+
+class ScrapeCheckpoint:
+    """
+    An append-only log of scrape progress. A line is written as each results page
+    is scraped, and another once a search term is finished, so after a crash the
+    log says exactly which terms are done and which page each partial term reached.
+    """
+
+    def __init__(self, path_to_checkpoint: Path = PATH_TO_CHECKPOINT):
+        self.path_to_checkpoint = path_to_checkpoint
+        # Search terms are scraped from several threads at once.
+        self._lock = Lock()
+
+    def reset(self):
+        """
+        Start a fresh log, forgetting any previous run's progress.
+        """
+        with self._lock:
+            self.path_to_checkpoint.unlink(missing_ok=True)
+
+    def load(self) -> dict[str, TermProgress]:
+        """
+        Replay the log into each search term's progress. A torn last line,
+        from a crash mid-write, is ignored.
+        """
+        progress: dict[str, TermProgress] = {}
+        if not self.path_to_checkpoint.is_file():
+            return progress
+        with open(self.path_to_checkpoint, "r") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                term_progress = progress.setdefault(record["term"], TermProgress())
+                if record["event"] == "page":
+                    term_progress.items.extend(record["items"])
+                    term_progress.last_page = record["page"]
+                elif record["event"] == "done":
+                    term_progress.done = True
+        return progress
+
+    def _append(self, record: dict):
+        with self._lock:
+            with open(self.path_to_checkpoint, "a") as file:
+                file.write(json.dumps(record) + "\n")
+                file.flush()
+                os.fsync(file.fileno())
+
+    def record_page(self, term: str, page: int, items: list[ImageRecord]):
+        self._append({
+            "event": "page", "term": term, "page": page,
+            "items": [record.to_dict() for record in items]})
+
+    def record_done(self, term: str):
+        self._append({"event": "done", "term": term})
@@ -0,0 +1,121 @@
+"""
+The command line interface, run with
+`python -m redbubble_scrape [scrape|download|run|coordinate|work]`.
+
+Only argparse is imported up front. The scraper, the downloader and their
+dependencies are imported by the subcommand that needs them, so for example a
+download only run never loads Selenium.
+"""
+from pathlib import Path
+import argparse
+import asyncio
+import sys
+
+from .config import SETTINGS
+
+
+async def run_command(args: argparse.Namespace):
+    from .main import main
+
+    await main(args.terms)
+
+
+async def scrape_command(args: argparse.Namespace):
+    from .main import load_config_json, scrape, write_metrics_reports
+
+    try:
+        await scrape(args.terms or load_config_json())
+    finally:
+        write_metrics_reports()
+
+
+async def download_command(args: argparse.Namespace):
+    from .main import download, write_metrics_reports
+
+    try:
+        await download(args.results)
+    finally:
+        write_metrics_reports()
+
+
+async def coordinate_command(args: argparse.Namespace):
+    from .main import coordinate, load_config_json
+
+    await coordinate(args.terms or load_config_json(), wait=args.wait)
+
+
+async def work_command(args: argparse.Namespace):
+    from .main import write_metrics_reports
+    from .worker import work
+
+    try:
+        await work()
+    finally:
+        write_metrics_reports()
+
+
+def add_scrape_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("terms", nargs="*", help="search terms, config.json's by default")
+    parser.add_argument("--backend", choices=["selenium", "http"], help="override SCRAPER_BACKEND")
+    parser.add_argument("--max-items", type=int, help="override MAX_ITEMS_PER_SCRAPE")
+
+
+def add_download_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--batch-size", type=int, help="override BATCH_SIZE")
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m redbubble_scrape",
+        description="Scrape Redbubble search results and download the images.")
+    subparsers = parser.add_subparsers(dest="command")
+
+    run_parser = subparsers.add_parser(
+        "run", help="scrape and download (the default)")
+    add_scrape_arguments(run_parser)
+    add_download_arguments(run_parser)
+    run_parser.set_defaults(handler=run_command)
+
+    scrape_parser = subparsers.add_parser(
+        "scrape", help="only scrape, writing the results file")
+    add_scrape_arguments(scrape_parser)
+    scrape_parser.set_defaults(handler=scrape_command)
+
+    download_parser = subparsers.add_parser(
+        "download", help="only download, from an earlier scrape's results file")
+    download_parser.add_argument(
+        "results", nargs="?", type=Path,
+        help="search_results.jsonl(.gz) or search_results.json, the configured results file by default")
+    add_download_arguments(download_parser)
+    download_parser.set_defaults(handler=download_command)
+
+    coordinate_parser = subparsers.add_parser(
+        "coordinate", help="queue search terms in the shared work queue for workers")
+    coordinate_parser.add_argument("terms", nargs="*", help="search terms, config.json's by default")
+    coordinate_parser.add_argument(
+        "--wait", action="store_true", help="wait for the workers to finish, then report each term")
+    coordinate_parser.set_defaults(handler=coordinate_command)
+
+    work_parser = subparsers.add_parser(
+        "work", help="lease search terms from the shared work queue, scraping and downloading each")
+    work_parser.add_argument("--backend", choices=["selenium", "http"], help="override SCRAPER_BACKEND")
+    work_parser.add_argument("--max-items", type=int, help="override MAX_ITEMS_PER_SCRAPE")
+    add_download_arguments(work_parser)
+    work_parser.set_defaults(handler=work_command)
+
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in (*subparsers.choices, "-h", "--help"):
+        # No subcommand keeps the original behaviour of scraping and downloading.
+        argv = ["run", *argv]
+    return parser.parse_args(argv)
+
+
+def cli(argv: list[str] | None = None):
+    args = parse_args(argv)
+    if getattr(args, "backend", None):
+        SETTINGS.SCRAPER_BACKEND = args.backend
+    if getattr(args, "max_items", None):
+        SETTINGS.MAX_ITEMS_PER_SCRAPE = args.max_items
+    if getattr(args, "batch_size", None):
+        SETTINGS.BATCH_SIZE = args.batch_size
+    asyncio.run(args.handler(args))
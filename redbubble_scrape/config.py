@@ -1,6 +1,7 @@
 from pydantic import BaseSettings
 import os
 from pathlib import Path
+from typing import Literal
 
 path_to_dotenv = Path(os.path.dirname(__file__)) / ".." / ".env"
 
@@ -14,6 +15,57 @@ class Settings(BaseSettings):
     MAX_ITEMS_PER_SCRAPE: int = 20
     BATCH_SIZE: int = 5
     DEBUG_MODE: bool = False
+    USE_HTTP2: bool = True
+    HTTP_TIMEOUT: float = 15.0
+    HTTP_MAX_CONNECTIONS: int = 20
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    MAX_CONNECTIONS_PER_HOST: int = 5
+    DOWNLOAD_CHUNK_SIZE: int = 65536
+    MAX_IMAGE_BYTES: int = 50_000_000
+    USE_DOWNLOAD_MANIFEST: bool = True
+    REVALIDATE_DOWNLOADS: bool = False
+    IMAGE_LINK_MODE: Literal["hardlink", "symlink", "copy"] = "hardlink"
+    SCRAPER_SESSIONS: int = 1
+    SELENIUM_REMOTE_URL: str | None = None
+    PIPELINE_DOWNLOADS: bool = True
+    PIPELINE_QUEUE_SIZE: int = 100
+    USE_BULK_DOM_EXTRACTION: bool = True
+    SCRAPER_BACKEND: Literal["selenium", "http"] = "selenium"
+    HTTP_SCRAPER_MAX_PAGES: int = 50
+    IMPLICIT_WAIT_SECONDS: float = 0.0
+    PAGE_LOAD_TIMEOUT: float = 15.0
+    IMAGE_SRC_TIMEOUT: float = 0.5
+    HYDRATE_LAZY_IMAGES: bool = True
+    HYDRATION_SCROLL_DELAY_MS: int = 50
+    WRITE_RUN_REPORT: bool = True
+    PROMETHEUS_TEXTFILE_PATH: str | None = None
+    MAX_DOWNLOAD_RETRIES: int = 3
+    RETRY_BACKOFF_BASE: float = 0.5
+    RETRY_MAX_DELAY: float = 30.0
+    ADAPTIVE_CONCURRENCY: bool = True
+    ADAPTIVE_LATENCY_TARGET: float = 5.0
+    PERSIST_FAILED_DOWNLOADS: bool = True
+    RESUME_SCRAPE: bool = False
+    RESULTS_FORMAT: Literal["jsonl", "json"] = "jsonl"
+    COMPRESS_RESULTS: bool = False
+    POST_PROCESS_IMAGES: bool = False
+    POST_PROCESS_WORKERS: int = 0
+    THUMBNAIL_SIZE: int = 256
+    WRITE_WEBP: bool = True
+    WEBP_QUALITY: int = 80
+    SKIP_NEAR_DUPLICATES: bool = False
+    NEAR_DUPLICATE_DISTANCE: int = 6
+    CHROMEDRIVER_PATH: str | None = None
+    REMOTE_WEBDRIVER_TIMEOUT: float = 60.0
+    DISK_WRITER_THREADS: int = 4
+    WRITE_BUFFER_SIZE: int = 262_144
+    FSYNC_WRITES: bool = False
+    FSYNC_BATCH_SIZE: int = 64
+    WORK_QUEUE_PATH: str | None = None
+    WORK_LEASE_SECONDS: float = 120.0
+    WORK_MAX_ATTEMPTS: int = 3
+    WORK_POLL_INTERVAL: float = 5.0
 
     class Config:
         env_file = path_to_dotenv
@@ -0,0 +1,148 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from threading import Lock
+from typing import Callable, TypeVar
+import asyncio
+import os
+
+T = TypeVar("T")
+
+
+class BufferedFile:
+    """
+    A file written through a DiskWriter. Chunks are gathered in memory and handed
+    to the writer's threads buffer_size bytes at a time, so an image takes a few trips
+    to a thread rather than one per chunk, while only buffer_size bytes of it are held at once.
+    """
+
+    def __init__(self, writer: "DiskWriter", path: Path):
+        self.writer = writer
+        self.path = path
+        self._buffer: list[bytes] = []
+        self._buffered = 0
+        self._fd: int | None = None
+
+    async def write(self, data: bytes):
+        self._buffer.append(data)
+        self._buffered += len(data)
+        if self._buffered >= self.writer.buffer_size:
+            await self.writer.run(self._write_out, self._take_buffer(), False)
+
+    async def close(self):
+        """
+        Write out whatever is still buffered and close the file.
+        """
+        await self.writer.run(self._write_out, self._take_buffer(), True)
+
+    def discard(self):
+        """
+        Close the file without writing the rest, e.g. when the download failed.
+        """
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _take_buffer(self) -> bytes:
+        data = b"".join(self._buffer)
+        self._buffer.clear()
+        self._buffered = 0
+        return data
+
+    def _write_out(self, data: bytes, close: bool):
+        # Runs on one of the writer's threads.
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self._fd, view):]
+        if close:
+            os.close(self._fd)
+            self._fd = None
+
+
+class DiskWriter:
+    """
+    Does the downloader's file system work (writing files, renames, links and fsyncs)
+    on a bounded pool of threads, so slow disks such as network mounted volumes
+    never block the event loop, and several writes are in flight at once.
+
+    At most max_pending operations are queued at a time, beyond that callers wait.
+    With fsync_batch_size set, finished files are fsynced in batches of that many,
+    along with their directories, instead of one at a time.
+    """
+
+    def __init__(
+            self,
+            threads: int = 4,
+            buffer_size: int = 262_144,
+            fsync_batch_size: int = 0,
+            max_pending: int = 0):
+        self.buffer_size = buffer_size
+        self.fsync_batch_size = fsync_batch_size
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(threads, 1), thread_name_prefix="disk_writer")
+        self._slots = asyncio.Semaphore(max_pending or max(threads, 1) * 4)
+        self._unsynced: list[Path] = []
+        # Directory handles are opened once and kept for fsyncing the directory entries.
+        self._directory_fds: dict[Path, int] = {}
+        self._directory_lock = Lock()
+
+    async def run(self, function: Callable[..., T], *args) -> T:
+        """
+        Run function on one of the writer's threads.
+        """
+        async with self._slots:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, function, *args)
+
+    def open(self, path: Path) -> BufferedFile:
+        return BufferedFile(self, path)
+
+    async def sync_later(self, path: Path):
+        """
+        Mark a finished file for fsyncing. Does nothing unless fsync_batch_size is set.
+        """
+        if not self.fsync_batch_size:
+            return
+        self._unsynced.append(path)
+        if len(self._unsynced) >= self.fsync_batch_size:
+            await self.flush()
+
+    async def flush(self):
+        """
+        fsync every file marked with sync_later so far.
+        """
+        if self._unsynced:
+            batch, self._unsynced = self._unsynced, []
+            await self.run(self._fsync_batch, batch)
+
+    def _fsync_batch(self, paths: list[Path]):
+        for path in paths:
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except FileNotFoundError:
+                continue
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        for directory in {path.parent for path in paths}:
+            os.fsync(self._directory_fd(directory))
+
+    def _directory_fd(self, directory: Path) -> int:
+        with self._directory_lock:
+            if directory not in self._directory_fds:
+                self._directory_fds[directory] = os.open(directory, os.O_RDONLY)
+            return self._directory_fds[directory]
+
+    async def close(self):
+        """
+        fsync anything outstanding, then stop the threads.
+        """
+        try:
+            await self.flush()
+        finally:
+            self._executor.shutdown(wait=True)
+            for fd in self._directory_fds.values():
+                os.close(fd)
+            self._directory_fds.clear()
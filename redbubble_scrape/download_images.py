@@ -1,18 +1,42 @@
 import os
 import asyncio
+import hashlib
 import httpx
 from pathlib import Path
-import aiofiles
-import re
+import time
+from contextlib import nullcontext
+from typing import Awaitable, Callable, TypeVar
+from urllib.parse import urlsplit
 
-from .schemas import ScraperResults, ImageMetadata
-
-STRING_SANITIZE_PATTERN = re.compile(r"[^\s\w]")
+from .config import SETTINGS
+from .disk_writer import DiskWriter
+from .image_store import ContentAddressedStore
+from .manifest import DownloadManifest
+from .metrics import METRICS
+from .near_duplicates import NearDuplicateIndex
+from .post_process import PostProcessor
+from .results_sink import iter_results
+from .rate_limit import AdaptiveLimiter, backoff_delay, is_retryable
+from .retry_queue import RetryQueue
+from .schemas import ScraperResults, ImageRecord, ManifestEntry, sanitize_string
 
 PATH_TO_IMAGE_FOLDER = Path(os.path.dirname(
     __file__)) / ".." / "Scraped_Images"
 if not PATH_TO_IMAGE_FOLDER.is_dir():
     PATH_TO_IMAGE_FOLDER.mkdir()
+PATH_TO_BLOB_FOLDER = PATH_TO_IMAGE_FOLDER / ".blobs"
+
+T = TypeVar("T")
+# Called with the search name and whether the image was saved, as each image finishes
+ImageDoneCallback = Callable[[str, bool], None]
+
+
+class ImageTooLarge(Exception):
+    """
+    Communicates that an image response exceeded
+    the MAX_IMAGE_BYTES guard and was abandoned.
+    """
+    ...
 
 
 class DownloadImages:
@@ -23,62 +47,330 @@ class DownloadImages:
 
     def __init__(
             self,
-            scrape_results: ScraperResults,
-            batch_size: int = 5):
+            scrape_results: ScraperResults | dict[str, list[ImageRecord]] | None = None,
+            batch_size: int = 5,
+            on_image_done: ImageDoneCallback | None = None):
         """
-        scrape_results_dicts: The results of the Selenium Scraper, passed
-        as a Pydantic Class for better type integrity.
-        batch_size: How many Images should be requested from Redbubble at once. 
-        Be very mindful of getting flagged for a DDOS attack if this is set too high!
+        scrape_results_dicts: The results of the scraper, either as returned by scrape_images
+        or validated into the Pydantic Class when they come from elsewhere. May be omitted
+        if the images are fed in through download_from_queue instead.
+        batch_size: How many Images should be requested from Redbubble at once,
+        across all search terms. Be very mindful of getting flagged for a DDOS attack if this is set too high!
+        on_image_done: Optionally called with the search name and whether the image
+        was saved as each image finishes, e.g. for a worker to tell when a term is done
         """
-        self.scrape_results_dict = scrape_results.results
+        if isinstance(scrape_results, ScraperResults):
+            scrape_results = scrape_results.to_records()
+        self.scrape_results_dict = scrape_results or {}
         self.batch_size = batch_size if batch_size < 50 and batch_size > 0 else 5
+        self.on_image_done = on_image_done
+        # The shared client and per-host semaphores only exist for the
+        # duration of a download_files run.
+        self.client: httpx.AsyncClient | None = None
+        self._host_semaphores: dict[str, asyncio.Semaphore] = {}
+        self.manifest: DownloadManifest | None = None
+        self.limiter: AdaptiveLimiter | None = None
+        self.retry_queue: RetryQueue | None = None
+        self.post_processor: PostProcessor | None = None
+        self.hash_index: NearDuplicateIndex | None = None
+        self.disk_writer: DiskWriter | None = None
+        # Bytes of freshly downloaded blobs, held only until the first
+        # image linked to the blob is handed to the post-processor.
+        self._fresh_bytes: dict[Path, bytes] = {}
+        self.image_store = ContentAddressedStore(
+            PATH_TO_BLOB_FOLDER, link_mode=SETTINGS.IMAGE_LINK_MODE)
+        # Maps each image URL to the task fetching it, so a URL that appears under
+        # several search terms at once is only requested once. As each fetch succeeds
+        # its task is swapped for the blob path, so later repeats in the run are not
+        # requested again either, with or without the manifest.
+        self._in_flight: dict[str, asyncio.Task] = {}
+        self._fetched_blobs: dict[str, Path] = {}
+        self._search_folders: dict[str, Path] = {}
 
     @staticmethod
-    def sanitize_string(string: str, repl: str = "_") -> str:
+    def build_client() -> httpx.AsyncClient:
         """
-        Remove any non-alphanumeric characters from the author/titles,
-        as these will likely cause an OS exception for an invalid filename.
+        Build the single AsyncClient shared by every download in a run.
+        Keeping the client (and therefore its connection pool) alive means
+        each image after the first reuses an open TCP/TLS connection to the
+        Redbubble CDN instead of paying for a fresh handshake.
         """
-        return re.sub(
-            pattern=STRING_SANITIZE_PATTERN,
-            string=string,
-            repl=repl)
+        limits = httpx.Limits(
+            max_connections=SETTINGS.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=SETTINGS.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=SETTINGS.HTTP_KEEPALIVE_EXPIRY)
+        return httpx.AsyncClient(
+            http2=SETTINGS.USE_HTTP2,
+            limits=limits,
+            timeout=SETTINGS.HTTP_TIMEOUT)
+
+    def _get_host_semaphore(self, url: str) -> asyncio.Semaphore:
+        """
+        httpx only limits the pool as a whole, so the per-host connection
+        cap is enforced with one semaphore per host.
+        """
+        host = urlsplit(url).netloc
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(
+                max(SETTINGS.MAX_CONNECTIONS_PER_HOST, 1))
+        return self._host_semaphores[host]
+
+    def _limiter_slot(self):
+        """
+        A slot from the adaptive limiter, or no limit beyond batch_size if it is off.
+        """
+        return self.limiter.slot() if self.limiter else nullcontext()
+
+    sanitize_string = staticmethod(sanitize_string)
 
     async def _request_and_download_image(
             self,
             dir_to_write_to: Path,
-            image_metadata: ImageMetadata):
+            image_metadata: ImageRecord):
         """
         Given the search term and scraped image metadata, request the image
-        from Redbubble, then write the image to the underlying OS.
+        from Redbubble, then link the stored image into the search folder.
+        With SKIP_NEAR_DUPLICATES, an image close enough to an already stored
+        design is not saved.
         """
-        async with httpx.AsyncClient() as client:
-            res = await client.get(
-                url=image_metadata.url,
-                timeout=15.0
-            )
-        res.raise_for_status()
+        path_to_image = dir_to_write_to / image_metadata.file_name
+        extension = path_to_image.suffix[1:]
+        if self._is_known_duplicate(image_metadata.url):
+            return
+
+        path_to_blob = self._fetched_blobs.get(image_metadata.url)
+        if path_to_blob is None:
+            if (fetch := self._in_flight.get(image_metadata.url)) is None:
+                fetch = self._in_flight[image_metadata.url] = asyncio.create_task(
+                    self._fetch_blob(image_metadata.url, extension))
+                fetch.add_done_callback(
+                    lambda task, url=image_metadata.url: self._fetch_done(url, task))
+            path_to_blob = await asyncio.shield(fetch)
+        if not self.post_processor:
+            await self._link_image(path_to_blob, path_to_image)
+            return
 
-        # Build the file_basename, and write to the OS.
-        title = self.sanitize_string(image_metadata.title)
-        author = self.sanitize_string(image_metadata.author)
-        extension = image_metadata.url.split('.')[-1]
+        source = self._fresh_bytes.pop(path_to_blob, path_to_blob)
+        perceptual_hash = None
+        reservation = None
+        hash_failed = False
+        if SETTINGS.SKIP_NEAR_DUPLICATES:
+            # Another search term may have just found this URL to be a duplicate.
+            if self._is_known_duplicate(image_metadata.url):
+                return
+            try:
+                perceptual_hash = await self.post_processor.perceptual_hash(source)
+            except Exception as exc:
+                # e.g. bytes Pillow cannot decode. The image is still saved,
+                # just without the near-duplicate check.
+                METRICS.increment("post_process_hash_failures_total")
+                print(f"Exception {exc} generated while hashing {image_metadata.url}, "
+                      "saving it without the near-duplicate check")
+                hash_failed = True
+        if perceptual_hash is not None:
+            duplicate_of = self.hash_index.find_duplicate(
+                perceptual_hash, image_metadata.url, SETTINGS.NEAR_DUPLICATE_DISTANCE)
+            if duplicate_of:
+                self._skip_near_duplicate(
+                    image_metadata.url, path_to_blob, source, perceptual_hash, duplicate_of)
+                return
+            # Reserved with no await since the lookup, so that two near-duplicates
+            # downloading at once cannot both be kept while this one is linked.
+            reservation = self.hash_index.reserve(
+                perceptual_hash, path_to_image, image_metadata.url)
+        try:
+            path_to_image = await self._link_image(path_to_blob, path_to_image)
+        except BaseException:
+            if reservation is not None:
+                self.hash_index.release(reservation)
+            raise
+        if reservation is not None:
+            self.hash_index.add(perceptual_hash, path_to_image, image_metadata.url, reservation)
+        if hash_failed and not self.post_processor.write_outputs:
+            # Only hashing was asked for, and that has already failed.
+            return
+        await self.post_processor.submit(
+            path_to_image, image_metadata.url, source, perceptual_hash)
 
-        async with aiofiles.open(
-                dir_to_write_to / f"{title}_{author}.{extension}",
-                "wb") as file:
-            await file.write(res.content)
+    def _fetch_done(self, url: str, fetch: asyncio.Task):
+        """
+        Keep only the blob path of a successful fetch. A failed one is forgotten,
+        so a later repeat of the URL tries again.
+        """
+        self._in_flight.pop(url, None)
+        if not fetch.cancelled() and fetch.exception() is None:
+            self._fetched_blobs[url] = fetch.result()
+
+    async def _link_image(self, path_to_blob: Path, path_to_image: Path) -> Path:
+        """
+        Link the blob into its search folder on the disk writer's threads.
+        Returns the path linked, which has a suffix if the name was taken.
+        """
+        path_to_image = await self.disk_writer.run(
+            self.image_store.link, path_to_blob, path_to_image)
+        await self.disk_writer.sync_later(path_to_image)
+        return path_to_image
+
+    def _is_known_duplicate(self, url: str) -> bool:
+        """
+        Whether url was already found to be a near-duplicate, this run or an earlier one,
+        in which case it is not requested again.
+        """
+        if SETTINGS.SKIP_NEAR_DUPLICATES and self.hash_index and url in self.hash_index.duplicate_urls:
+            METRICS.increment("download_near_duplicates_skipped_total")
+            return True
+        return False
+
+    def _skip_near_duplicate(
+            self,
+            url: str,
+            path_to_blob: Path,
+            source: bytes | Path,
+            perceptual_hash: str,
+            duplicate_of: str):
+        """
+        Record url as a near-duplicate of an already stored design instead of
+        saving it. A freshly downloaded blob is removed too, unless an image
+        links to it (e.g. identical bytes from another URL).
+        """
+        METRICS.increment("download_near_duplicates_total")
+        print(f"{url} is a near-duplicate of {duplicate_of}, not saving it")
+        self.hash_index.add_duplicate(perceptual_hash, url, duplicate_of)
+        if isinstance(source, bytes) and SETTINGS.IMAGE_LINK_MODE != "symlink":
+            if path_to_blob.is_file() and path_to_blob.stat().st_nlink == 1:
+                path_to_blob.unlink(missing_ok=True)
+
+    async def _fetch_blob(self, url: str, extension: str) -> Path:
+        """
+        Make sure the image at url is in the content addressed store,
+        downloading it only if required. Returns the blob path.
+        """
+        # If the manifest says we already have this exact blob, either skip
+        # the request outright or ask the server whether it has changed.
+        headers = {}
+        path_to_cached_blob = None
+        entry = self.manifest.get(url) if self.manifest else None
+        if entry:
+            path_to_blob = self.image_store.blob_path(entry.sha256, extension)
+            if path_to_blob.is_file() and path_to_blob.stat().st_size == entry.size:
+                if not SETTINGS.REVALIDATE_DOWNLOADS:
+                    METRICS.increment("download_skipped_total")
+                    return path_to_blob
+                headers = DownloadManifest.conditional_headers(entry)
+                path_to_cached_blob = path_to_blob
+
+        # Transient failures (timeouts, 429s, 5xxs) are retried with backoff.
+        for attempt in range(SETTINGS.MAX_DOWNLOAD_RETRIES + 1):
+            try:
+                return await self._download_blob(
+                    url, extension, headers, path_to_cached_blob)
+            except Exception as exc:
+                if attempt == SETTINGS.MAX_DOWNLOAD_RETRIES or not is_retryable(exc):
+                    raise
+                METRICS.increment("download_retries_total")
+                await asyncio.sleep(backoff_delay(
+                    exc, attempt, SETTINGS.RETRY_BACKOFF_BASE, SETTINGS.RETRY_MAX_DELAY))
+
+    async def _download_blob(
+            self,
+            url: str,
+            extension: str,
+            headers: dict[str, str],
+            path_to_cached_blob: Path | None) -> Path:
+        """
+        Make one request for the image and add it to the store. If the server
+        answers 304 Not Modified, path_to_cached_blob is returned instead.
+        """
+        path_to_temp_file = self.image_store.temp_path()
+        try:
+            async with self._get_host_semaphore(url), self._limiter_slot():
+                request_start = time.perf_counter()
+                async with self.client.stream("GET", url, headers=headers) as res:
+                    # Latency is measured to the response headers, the body is timed below.
+                    METRICS.observe(
+                        "download_http_latency_seconds", time.perf_counter() - request_start)
+                    METRICS.increment(f"download_responses_{res.status_code}_total")
+                    if res.status_code == 304:
+                        # Read the empty body so the connection goes back to the pool.
+                        await res.aread()
+                        METRICS.increment("download_not_modified_total")
+                        return path_to_cached_blob
+                    res.raise_for_status()
+                    size, sha256, body = await self._stream_response_to_file(
+                        res, path_to_temp_file, keep_body=self.post_processor is not None)
+                METRICS.observe("download_seconds", time.perf_counter() - request_start)
+            path_to_blob = await self.disk_writer.run(
+                self.image_store.add, path_to_temp_file, sha256, extension)
+            await self.disk_writer.sync_later(path_to_blob)
+            if body is not None:
+                self._fresh_bytes[path_to_blob] = body
+        finally:
+            path_to_temp_file.unlink(missing_ok=True)
+
+        METRICS.increment("download_success_total")
+        METRICS.increment("download_bytes_total", size)
+        if self.manifest:
+            self.manifest.record(ManifestEntry(
+                url=url,
+                path=str(path_to_blob.relative_to(PATH_TO_IMAGE_FOLDER)),
+                size=size,
+                sha256=sha256,
+                etag=res.headers.get("ETag"),
+                last_modified=res.headers.get("Last-Modified")))
+        return path_to_blob
+
+    async def _stream_response_to_file(
+            self,
+            res: httpx.Response,
+            path_to_temp_file: Path,
+            keep_body: bool = False) -> tuple[int, str, bytes | None]:
+        """
+        Write the response body to a temporary file through the disk writer. At most
+        WRITE_BUFFER_SIZE bytes per download are held in memory, and the file is only moved
+        into the store once complete, so a half written image never appears.
+        Returns the number of bytes written and their sha256 hex digest, along
+        with the body itself if keep_body is set, e.g. for the post-processor.
+        """
+        max_bytes = SETTINGS.MAX_IMAGE_BYTES
+        content_length = res.headers.get("Content-Length")
+        if max_bytes and content_length and int(content_length) > max_bytes:
+            raise ImageTooLarge(
+                f"{res.url} is {content_length} bytes, over the {max_bytes} byte limit.")
+
+        bytes_written = 0
+        write_seconds = 0.0
+        content_hash = hashlib.sha256()
+        body = bytearray() if keep_body else None
+        file = self.disk_writer.open(path_to_temp_file)
+        try:
+            async for chunk in res.aiter_bytes(SETTINGS.DOWNLOAD_CHUNK_SIZE):
+                bytes_written += len(chunk)
+                if max_bytes and bytes_written > max_bytes:
+                    raise ImageTooLarge(
+                        f"{res.url} exceeded the {max_bytes} byte limit.")
+                content_hash.update(chunk)
+                if body is not None:
+                    body += chunk
+                write_start = time.perf_counter()
+                await file.write(chunk)
+                write_seconds += time.perf_counter() - write_start
+            write_start = time.perf_counter()
+            await file.close()
+            write_seconds += time.perf_counter() - write_start
+        finally:
+            file.discard()
+        METRICS.observe("download_disk_write_seconds", write_seconds)
+        return bytes_written, content_hash.hexdigest(), bytes(body) if body is not None else None
 
     @staticmethod
-    def print_exceptions(outcomes: list):
+    def print_exception(image_metadata: ImageRecord, exc: Exception):
         """
-        Exceptions in the asyncio.gather are returned. 
-        print any exceptions out.
+        A failed download should not stop the other workers,
+        so print the exception out and move on.
         """
-        for outcome in outcomes:
-            if isinstance(outcome, Exception):
-                print(f"Exception {outcome} generated during download")
+        METRICS.increment("download_failures_total")
+        METRICS.increment(f"download_failures_{type(exc).__name__}_total")
+        print(f"Exception {exc} generated during download of {image_metadata.url}")
 
     @staticmethod
     def build_search_folder(search_name: str) -> Path:
@@ -103,19 +395,140 @@ class DownloadImages:
         """
         print("-" * 75)
         print("Begginning Image Download...")
+        # Queue every search's images up front, then let the worker pool
+        # drain the queue. The concurrency cap applies across all search terms at once.
+        download_queue: asyncio.Queue = asyncio.Queue()
         for search_name, search_results in self.scrape_results_dict.items():
-            path_to_search_folder = self.build_search_folder(
+            print(f"Queueing {len(search_results)} images for => {search_name}")
+            for image_metadata in search_results:
+                download_queue.put_nowait((search_name, image_metadata))
+        await self.download_from_queue(download_queue)
+
+    async def download_results_file(self, path_to_results: Path):
+        """
+        Download every image in a JSON Lines results file. The file is streamed
+        onto a bounded queue as the workers drain it, so only PIPELINE_QUEUE_SIZE
+        records are in memory at once however large the file is.
+        """
+        print("-" * 75)
+        print(f"Begginning Image Download from {path_to_results.name}...")
+        download_queue: asyncio.Queue = asyncio.Queue(
+            maxsize=SETTINGS.PIPELINE_QUEUE_SIZE)
+
+        async def queue_results():
+            for search_name, image_metadata in iter_results(path_to_results):
+                await download_queue.put((search_name, image_metadata))
+
+        await self.download_from_queue(download_queue, producer=queue_results())
+
+    async def download_from_queue(
+            self,
+            download_queue: asyncio.Queue,
+            producer: Awaitable[T] | None = None) -> T | None:
+        """
+        Download (search_name, metadata) pairs from the queue until it is drained.
+
+        producer: Optionally, the awaitable still feeding the queue, e.g. a
+        scrape running in a thread. Downloads start straight away and overlap
+        with it, and the queue is only considered drained once it has finished.
+        Its result is returned.
+        """
+        if SETTINGS.USE_DOWNLOAD_MANIFEST:
+            self.manifest = DownloadManifest()
+        if SETTINGS.ADAPTIVE_CONCURRENCY:
+            # batch_size stays the hard cap, the limiter finds the rate below it
+            # that the server is happy with.
+            self.limiter = AdaptiveLimiter(
+                initial=max(self.batch_size // 2, 1),
+                maximum=self.batch_size,
+                latency_target=SETTINGS.ADAPTIVE_LATENCY_TARGET)
+        if SETTINGS.PERSIST_FAILED_DOWNLOADS:
+            self.retry_queue = RetryQueue()
+        self.disk_writer = DiskWriter(
+            threads=SETTINGS.DISK_WRITER_THREADS,
+            buffer_size=SETTINGS.WRITE_BUFFER_SIZE,
+            fsync_batch_size=SETTINGS.FSYNC_BATCH_SIZE if SETTINGS.FSYNC_WRITES else 0)
+        if SETTINGS.POST_PROCESS_IMAGES or SETTINGS.SKIP_NEAR_DUPLICATES:
+            self.hash_index = NearDuplicateIndex(PATH_TO_IMAGE_FOLDER)
+            self.post_processor = PostProcessor(
+                self.hash_index,
+                write_outputs=SETTINGS.POST_PROCESS_IMAGES,
+                workers=SETTINGS.POST_PROCESS_WORKERS)
+        try:
+            async with self.build_client() as client:
+                self.client = client
+                workers = [asyncio.create_task(self._download_worker(download_queue))
+                           for _ in range(self.batch_size)]
+                try:
+                    if self.retry_queue:
+                        # Images that failed last run go in first.
+                        for retry_item in self.retry_queue.load():
+                            await download_queue.put(retry_item)
+                    producer_result = await producer if producer else None
+                    await download_queue.join()
+                    if self.post_processor:
+                        await self.post_processor.join()
+                finally:
+                    for worker in workers:
+                        worker.cancel()
+                    await asyncio.gather(*workers, return_exceptions=True)
+                return producer_result
+        finally:
+            self.client = None
+            self.limiter = None
+            self._in_flight.clear()
+            self._fetched_blobs.clear()
+            self._fresh_bytes.clear()
+            await self.disk_writer.close()
+            self.disk_writer = None
+            if self.post_processor:
+                self.post_processor.close()
+                self.post_processor = None
+            if self.hash_index:
+                self.hash_index.close()
+                self.hash_index = None
+            if self.retry_queue:
+                self.retry_queue.save()
+                self.retry_queue = None
+            if self.manifest:
+                self.manifest.close()
+                self.manifest = None
+
+    def _get_search_folder(self, search_name: str) -> Path:
+        """
+        build_search_folder, but only touching the OS once per search term.
+        """
+        if search_name not in self._search_folders:
+            self._search_folders[search_name] = self.build_search_folder(
                 search_name=search_name)
-            print(f"Downloading images for => {search_name}")
-            # In batches of the batch size, download the images.
-            lower = 0
-            while metadata_to_download := search_results[lower: lower + self.batch_size]:
-                download_outcomes = await asyncio.gather(
-                    *(self._request_and_download_image(
-                        dir_to_write_to=path_to_search_folder,
-                        image_metadata=image_metadata) for image_metadata in metadata_to_download
-                      ),
-                    return_exceptions=True
-                )
-                self.print_exceptions(download_outcomes)
-                lower += self.batch_size
+        return self._search_folders[search_name]
+
+    async def _download_worker(self, download_queue: asyncio.Queue):
+        """
+        Pull (search_name, metadata) pairs off the queue and download them one
+        at a time. Running batch_size of these workers keeps exactly
+        batch_size downloads in flight, so one slow image only occupies
+        its own worker instead of stalling a whole batch.
+        """
+        while True:
+            search_name, image_metadata = await download_queue.get()
+            saved = False
+            # Left unset if the download is cancelled part way, e.g. because the run
+            # was stopped, so an item retried from the last run is saved again.
+            finished = False
+            try:
+                await self._request_and_download_image(
+                    dir_to_write_to=self._get_search_folder(search_name),
+                    image_metadata=image_metadata)
+                saved = finished = True
+            except Exception as exc:
+                self.print_exception(image_metadata, exc)
+                if self.retry_queue and is_retryable(exc):
+                    self.retry_queue.add(search_name, image_metadata, exc)
+                finished = True
+            finally:
+                if self.retry_queue and finished:
+                    self.retry_queue.finish(image_metadata)
+                if self.on_image_done:
+                    self.on_image_done(search_name, saved)
+                download_queue.task_done()
@@ -0,0 +1,110 @@
+from contextlib import contextmanager
+from queue import Empty, Queue
+from threading import Lock
+from typing import Callable, Iterator
+
+from selenium.webdriver.remote.webdriver import WebDriver
+
+
+class DriverPool:
+    """
+    A pool of WebDriver sessions shared by the scraper's worker threads.
+    Each thread checks a session out for one search term at a time, so
+    no two threads ever drive the same browser.
+    """
+
+    def __init__(
+            self,
+            size: int,
+            driver_factory: Callable[[], WebDriver]):
+        """
+        size: The maximum number of sessions open at once.
+        driver_factory: Called to open a new, ready to use session.
+        """
+        self.size = max(size, 1)
+        self.driver_factory = driver_factory
+        self._idle_drivers: Queue[WebDriver] = Queue()
+        self._open_drivers: list[WebDriver] = []
+        self._lock = Lock()
+
+    def _acquire(self) -> WebDriver:
+        """
+        Reuse an idle session, open a new one if the pool is not full,
+        otherwise wait for a session to be released.
+        """
+        while True:
+            try:
+                return self._idle_drivers.get_nowait()
+            except Empty:
+                pass
+            with self._lock:
+                if len(self._open_drivers) < self.size:
+                    # Reserve the slot before the slow driver start up.
+                    self._open_drivers.append(None)
+                    break
+            # A slot may also free up when a broken session is
+            # discarded, so wait with a timeout and check again.
+            try:
+                return self._idle_drivers.get(timeout=1)
+            except Empty:
+                continue
+        try:
+            driver = self.driver_factory()
+        except Exception:
+            with self._lock:
+                self._open_drivers.remove(None)
+            raise
+        with self._lock:
+            self._open_drivers[self._open_drivers.index(None)] = driver
+        return driver
+
+    def _discard(self, driver: WebDriver):
+        """
+        Quit a session that is no longer trusted and free its slot.
+        """
+        with self._lock:
+            if driver in self._open_drivers:
+                self._open_drivers.remove(driver)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _is_alive(driver: WebDriver) -> bool:
+        try:
+            driver.current_url
+            return True
+        except Exception:
+            return False
+
+    @contextmanager
+    def session(self) -> Iterator[WebDriver]:
+        """
+        Check a session out of the pool. A session that raised, or that
+        no longer responds afterwards, is quit rather than handed to the
+        next search term, so one crashed browser cannot poison the rest.
+        """
+        driver = self._acquire()
+        try:
+            yield driver
+        except Exception:
+            self._discard(driver)
+            raise
+        if self._is_alive(driver):
+            self._idle_drivers.put(driver)
+        else:
+            self._discard(driver)
+
+    def close(self):
+        """
+        Quit every open session.
+        """
+        with self._lock:
+            drivers, self._open_drivers = self._open_drivers, []
+        for driver in drivers:
+            if driver is not None:
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
@@ -0,0 +1,265 @@
+from contextlib import contextmanager
+from html.parser import HTMLParser
+from typing import Iterator
+from urllib.parse import urlencode
+import asyncio
+
+import httpx
+
+from .checkpoint import ScrapeCheckpoint
+from .config import SETTINGS
+from .metrics import METRICS
+from .schemas import ImageRecord, TermProgress
+from .scraper_backend import PageScrapedCallback, ScrapeFunction, ScraperBackend
+
+SEARCH_URL = "https://www.redbubble.com/shop/"
+
+REQUEST_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/113.0.0.0 Safari/537.36"),
+    "Accept": "text/html,application/xhtml+xml",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+
+class SearchResultsParser(HTMLParser):
+    """
+    Parses a Redbubble search results page into raw tiles, one per <a/> beneath
+    the 'SearchResultsGrid' <div/>, in the same shape ScraperBackend.parse_tile expects.
+
+    Like the Selenium scraper, the text of a <span/> includes the text of any
+    spans nested inside it, and the price is the first span directly inside another span.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.tiles: list[dict] = []
+        # Depth of nested <div/>s inside the grid, 0 when outside of it.
+        self._grid_div_depth = 0
+        self._current_tile: dict | None = None
+        self._tile_spans: list[dict] = []
+        self._open_spans: list[dict] = []
+
+    @staticmethod
+    def _find_jpg_src(attrs: dict[str, str | None]) -> str | None:
+        """
+        Lazy loaded images may only have their URL in data-src or srcset.
+        """
+        candidates = [attrs.get("src"), attrs.get("data-src")]
+        for srcset in (attrs.get("srcset"), attrs.get("data-srcset")):
+            if srcset:
+                candidates.extend(
+                    candidate.split()[0] for candidate in srcset.split(",") if candidate.strip())
+        for candidate in candidates:
+            if candidate and candidate.endswith(".jpg"):
+                return candidate
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]):
+        attrs = dict(attrs)
+        if self._grid_div_depth == 0:
+            if tag == "div" and attrs.get("id") == "SearchResultsGrid":
+                self._grid_div_depth = 1
+            return
+
+        if tag == "div":
+            self._grid_div_depth += 1
+        elif tag == "a":
+            self._current_tile = {"price": "", "texts": [], "srcs": [], "displayed": True}
+            self._tile_spans = []
+            self._open_spans = []
+        elif self._current_tile is None:
+            return
+        elif tag == "span":
+            span = {"parts": [], "nested": bool(self._open_spans)}
+            self._tile_spans.append(span)
+            self._open_spans.append(span)
+        elif tag == "img":
+            if src := self._find_jpg_src(attrs):
+                self._current_tile["srcs"].append(src)
+
+    def handle_endtag(self, tag: str):
+        if self._grid_div_depth == 0:
+            return
+        if tag == "div":
+            self._grid_div_depth -= 1
+        elif tag == "span" and self._open_spans:
+            self._open_spans.pop()
+        elif tag == "a" and self._current_tile is not None:
+            self._finish_tile()
+
+    def handle_data(self, data: str):
+        for span in self._open_spans:
+            span["parts"].append(data)
+
+    def _finish_tile(self):
+        for span in self._tile_spans:
+            text = " ".join("".join(span["parts"]).split())
+            if span["nested"] and text and not self._current_tile["price"]:
+                self._current_tile["price"] = text
+            if text and "$" not in text:
+                self._current_tile["texts"].append(text)
+        self.tiles.append(self._current_tile)
+        self._current_tile = None
+        self._tile_spans = []
+        self._open_spans = []
+
+
+def parse_search_results_page(html: str) -> list[dict]:
+    """
+    Parse a search results page into raw tiles.
+    """
+    parser = SearchResultsParser()
+    parser.feed(html)
+    parser.close()
+    return parser.tiles
+
+
+class HttpScrapeRedbubble(ScraperBackend):
+    """
+    A scraper backend that needs no browser. Search result pages are fetched
+    directly with HTTPX and parsed with the standard library's HTMLParser.
+    Pagination is done by requesting the next page's URL rather than clicking 'Next'.
+    """
+
+    def __init__(
+            self,
+            client: httpx.AsyncClient,
+            search_input: str,
+            search_size_max: int,
+            on_page_scraped: PageScrapedCallback | None = None,
+            checkpoint: ScrapeCheckpoint | None = None,
+            progress: TermProgress | None = None,
+            keep_results: bool = True):
+        """
+        client: The HTTPX client shared by every search term
+        search_input: The string being searched
+        search_size_max: the max number of image metadata to scrape for the given search term
+        on_page_scraped: Optionally called with the search term and the new metadata
+        as soon as each results page is scraped
+        checkpoint: Optionally, the log each scraped page and the finished term are recorded to
+        progress: Optionally, this term's progress from an interrupted run. The scrape
+        carries on from the page after the last one recorded.
+        keep_results: Whether to keep the scraped metadata, or only count it
+        """
+        self.client = client
+        self.search_input = search_input
+        self.search_size_max = search_size_max
+        self.on_page_scraped = on_page_scraped
+        self.checkpoint = checkpoint
+        self._start_results(progress, keep_results)
+        self.first_page = progress.last_page + 1 if progress else 1
+
+    @staticmethod
+    def search_page_url(search_input: str, page: int) -> str:
+        return f"{SEARCH_URL}?{urlencode({'query': search_input, 'page': page})}"
+
+    async def _fetch_page(self, page: int) -> str:
+        with METRICS.timer("scrape_page_load_seconds"):
+            res = await self.client.get(self.search_page_url(self.search_input, page))
+        res.raise_for_status()
+        return res.text
+
+    async def search_and_scrape_pictures(self) -> list[ImageRecord] | int:
+        """
+        Performs all of the necessary scraping operations for a single
+        search term, following pages until the max is reached or a page has no results.
+        """
+        try:
+            for page in range(self.first_page, SETTINGS.HTTP_SCRAPER_MAX_PAGES + 1):
+                html = await self._fetch_page(page)
+                with METRICS.timer("scrape_tile_extraction_seconds"):
+                    tiles = parse_search_results_page(html)
+                METRICS.increment("scrape_tiles_total", len(tiles))
+                remaining = self.search_size_max - self.items_scraped
+                this_page_scraped_metadata = [
+                    metadata for tile in tiles
+                    if (metadata := self.parse_tile(tile))][:remaining]
+                if not this_page_scraped_metadata:
+                    break
+                self._add_results(this_page_scraped_metadata)
+                if self.checkpoint:
+                    self.checkpoint.record_page(
+                        self.search_input, page, this_page_scraped_metadata)
+                if self.on_page_scraped:
+                    self.on_page_scraped(self.search_input, this_page_scraped_metadata)
+                if self.items_scraped >= self.search_size_max:
+                    break
+            if self.checkpoint:
+                self.checkpoint.record_done(self.search_input)
+        finally:
+            METRICS.increment("scrape_items_total", self.items_scraped)
+            print(f"{self.search_input} => got {self.items_scraped} items from scrape")
+        return self.results()
+
+    @classmethod
+    async def _scrape_all(
+            cls,
+            search_list: list[str],
+            max_search_result_size: int,
+            on_page_scraped: PageScrapedCallback | None,
+            keep_results: bool,
+            checkpoint: ScrapeCheckpoint,
+            progress_by_term: dict[str, TermProgress]) -> dict:
+        """
+        Scrape up to SCRAPER_SESSIONS search terms at once over one shared client.
+        Search terms the checkpoint has as finished are not scraped again.
+        """
+        semaphore = asyncio.Semaphore(max(SETTINGS.SCRAPER_SESSIONS, 1))
+
+        async def scrape_search_term(client: httpx.AsyncClient, search_term: str):
+            progress = progress_by_term.get(search_term)
+            cls.replay_progress(search_term, progress, on_page_scraped)
+            if progress and progress.done:
+                print(f"{search_term} => already scraped, resuming with {len(progress.items)} items")
+                return cls.finished_results(progress, keep_results)
+            async with semaphore:
+                return await cls(
+                    client=client,
+                    search_input=search_term,
+                    search_size_max=max_search_result_size,
+                    on_page_scraped=on_page_scraped,
+                    checkpoint=checkpoint,
+                    progress=progress,
+                    keep_results=keep_results).search_and_scrape_pictures()
+
+        async with httpx.AsyncClient(
+                headers=REQUEST_HEADERS,
+                follow_redirects=True,
+                timeout=SETTINGS.HTTP_TIMEOUT) as client:
+            outcomes = await asyncio.gather(
+                *(scrape_search_term(client, search_term) for search_term in search_list),
+                return_exceptions=True)
+
+        scrape_results = {}
+        for search_term, outcome in zip(search_list, outcomes):
+            if isinstance(outcome, Exception):
+                METRICS.increment("scrape_failures_total")
+                print(f"Uncaught exception: {outcome} for: {search_term}")
+            else:
+                scrape_results[search_term] = outcome
+        return scrape_results
+
+    @classmethod
+    @contextmanager
+    def open_session(
+            cls,
+            max_search_result_size: int = 15,
+            on_page_scraped: PageScrapedCallback | None = None,
+            keep_results: bool = True) -> Iterator[ScrapeFunction]:
+        """
+        The scrape function runs its own event loop, so call it from a thread when
+        already inside one. Each call opens its own client, as a client is tied to
+        its event loop, and unlike a browser costs next to nothing to start.
+        """
+        checkpoint, progress_by_term = cls.open_checkpoint()
+        with cls.open_results_sink(on_page_scraped) as on_page_scraped:
+            def scrape(search_list: list[str]) -> dict:
+                return asyncio.run(cls._scrape_all(
+                    search_list,
+                    max_search_result_size,
+                    on_page_scraped,
+                    keep_results,
+                    checkpoint,
+                    progress_by_term))
+            yield scrape
@@ -0,0 +1,111 @@
+import filecmp
+import os
+import shutil
+import uuid
+from pathlib import Path
+
+
+class ContentAddressedStore:
+    """
+    Stores each distinct image exactly once, named by the sha256 of its bytes.
+    The per-search folders in `Scraped_Images` only hold links into the store,
+    so a design that shows up under several search terms costs its bytes once.
+    """
+
+    def __init__(self, path_to_store: Path, link_mode: str = "hardlink"):
+        """
+        path_to_store: The folder the blobs are written under.
+        link_mode: How search folder files point at blobs: 'hardlink', 'symlink' or 'copy'.
+        A hardlink falls back to a copy if the OS refuses it (e.g. across devices).
+        """
+        if link_mode not in ("hardlink", "symlink", "copy"):
+            raise ValueError(f"Unknown link mode: {link_mode}")
+        self.path_to_store = path_to_store
+        self.link_mode = link_mode
+        self.path_to_temp_folder = path_to_store / "tmp"
+        self.path_to_temp_folder.mkdir(parents=True, exist_ok=True)
+        # Shard folders known to exist, so each is only created once
+        self._shard_folders: set[Path] = set()
+
+    def temp_path(self) -> Path:
+        """
+        A unique path to stream a download to. It lives inside the store
+        so that adding it is a rename rather than a copy.
+        """
+        return self.path_to_temp_folder / f"{uuid.uuid4().hex}.part"
+
+    def blob_path(self, sha256: str, extension: str) -> Path:
+        return self.path_to_store / sha256[:2] / f"{sha256}.{extension}"
+
+    def add(self, path_to_temp_file: Path, sha256: str, extension: str) -> Path:
+        """
+        Move a completed download into the store, or discard it if the
+        same bytes are already stored. Returns the blob path.
+        """
+        path_to_blob = self.blob_path(sha256, extension)
+        if path_to_blob.is_file():
+            path_to_temp_file.unlink(missing_ok=True)
+        else:
+            if path_to_blob.parent not in self._shard_folders:
+                path_to_blob.parent.mkdir(exist_ok=True)
+                self._shard_folders.add(path_to_blob.parent)
+            os.replace(path_to_temp_file, path_to_blob)
+        return path_to_blob
+
+    def link(self, path_to_blob: Path, path_to_image: Path) -> Path:
+        """
+        Make path_to_image point at the blob. If a different image already
+        has that name, the blob's short hash is added to the name (and then a
+        counter) rather than overwriting it. Returns the path that was linked.
+
+        The final name is claimed with os.link, which fails rather than replacing
+        an existing file, so this is safe to call from several threads or processes.
+        """
+        # Create the link under a temporary name first so the final
+        # name only ever appears fully formed.
+        path_to_temp_link = path_to_image.with_name(
+            f".{path_to_image.name}.{uuid.uuid4().hex}.link")
+        try:
+            self._make_link(path_to_blob, path_to_temp_link)
+            for candidate in self._candidate_names(path_to_image, path_to_blob):
+                try:
+                    os.link(path_to_temp_link, candidate, follow_symlinks=False)
+                    return candidate
+                except FileExistsError:
+                    if self._points_at(candidate, path_to_blob):
+                        return candidate
+        finally:
+            path_to_temp_link.unlink(missing_ok=True)
+
+    def _points_at(self, path_to_image: Path, path_to_blob: Path) -> bool:
+        """
+        Whether an existing image is already this blob. Copies (including
+        hardlinks that fell back to copies) are not the same file, so their
+        bytes are compared instead.
+        """
+        if path_to_image.samefile(path_to_blob):
+            return True
+        return filecmp.cmp(path_to_image, path_to_blob, shallow=False)
+
+    @staticmethod
+    def _candidate_names(path_to_image: Path, path_to_blob: Path):
+        yield path_to_image
+        stem = f"{path_to_image.stem}_{path_to_blob.stem[:8]}"
+        yield path_to_image.with_stem(stem)
+        counter = 2
+        while True:
+            yield path_to_image.with_stem(f"{stem}_{counter}")
+            counter += 1
+
+    def _make_link(self, path_to_blob: Path, path_to_link: Path):
+        if self.link_mode == "symlink":
+            path_to_link.symlink_to(
+                os.path.relpath(path_to_blob, path_to_link.parent))
+            return
+        if self.link_mode == "hardlink":
+            try:
+                os.link(path_to_blob, path_to_link)
+                return
+            except OSError:
+                pass
+        shutil.copyfile(path_to_blob, path_to_link)
@@ -1,12 +1,16 @@
+import asyncio
 import json
 import os
 from pathlib import Path
 
 from .download_images import DownloadImages
-from .redbubble_scraper import ScrapeRedbubble
+from .scraper_backend import PATH_TO_RESULTS_JSON, get_scraper_backend
 from .config import SETTINGS
-from .schemas import ScraperResults
+from .metrics import METRICS
+from .results_sink import results_path
+from .schemas import ImageRecord, ScraperResults
 from .utils import block_for_user_input
+from .work_queue import open_work_queue
 
 
 def load_config_json() -> list[str]:
@@ -27,23 +31,158 @@ def load_config_json() -> list[str]:
     return search_list
 
 
-async def main():
+async def scrape_and_download_pipelined(search_list: list[str]) -> dict:
     """
-    The main function first calls the Scrape_Redbubble class, which opens a browser, 
-    and performs the necessary web scraping. The web scraping results are then passed into the 
+    Run the scraper and the downloader at the same time. The scraper runs in a
+    thread and puts each page's metadata onto a bounded queue as soon as the page
+    is scraped, and the download workers start on it straight away. When the
+    downloads fall behind the queue fills up, and the scraper waits for room.
+    """
+    loop = asyncio.get_running_loop()
+    download_queue: asyncio.Queue = asyncio.Queue(
+        maxsize=SETTINGS.PIPELINE_QUEUE_SIZE)
+
+    def on_page_scraped(search_term: str, page_metadata: list[ImageRecord]):
+        # Called from the scraper threads, so hand over to the event loop and
+        # block until there is room on the queue.
+        for record in page_metadata:
+            asyncio.run_coroutine_threadsafe(
+                download_queue.put((search_term, record)), loop).result()
+
+    scraper = get_scraper_backend(SETTINGS.SCRAPER_BACKEND)
+    scrape = asyncio.to_thread(
+        scraper.scrape_images,
+        search_list,
+        SETTINGS.MAX_ITEMS_PER_SCRAPE,
+        on_page_scraped,
+        keep_results=keeps_scrape_results())
+
+    print("Downloading images while scraping...")
+    return await DownloadImages(
+        batch_size=SETTINGS.BATCH_SIZE).download_from_queue(
+            download_queue, producer=scrape)
+
+
+def write_metrics_reports():
+    """
+    Append this run's metrics to run_report.jsonl, and write the
+    Prometheus text file if one is configured.
+    """
+    if SETTINGS.WRITE_RUN_REPORT:
+        METRICS.write_run_report()
+    if SETTINGS.PROMETHEUS_TEXTFILE_PATH:
+        METRICS.write_prometheus_textfile(Path(SETTINGS.PROMETHEUS_TEXTFILE_PATH))
+
+
+async def main(search_list: list[str] | None = None):
+    """
+    The main function first calls the scraper backend chosen by SCRAPER_BACKEND (by default
+    the Scrape_Redbubble class, which opens a browser), and performs the necessary web scraping. The web scraping results are then passed into the 
     Download_Images class, which uses HTTPX to gather all of the pictures.
+    Unless DEBUG_MODE is set, the two run as a pipeline, with downloads starting
+    as soon as the first page is scraped. The search terms come from config.json unless given.
     """
-    search_list = load_config_json()
+    search_list = search_list or load_config_json()
+    try:
+        await scrape_and_download(search_list)
+    finally:
+        write_metrics_reports()
+
 
-    search_results_dict = ScrapeRedbubble.scrape_images(
+def keeps_scrape_results() -> bool:
+    """
+    Only a search_results.json is written from results held in memory. JSON Lines
+    results are streamed to disk page by page, so the scraper only keeps counts.
+    """
+    return SETTINGS.RESULTS_FORMAT == "json"
+
+
+async def scrape(search_list: list[str]) -> dict:
+    """
+    Only scrape, leaving the results in search_results.jsonl (or search_results.json)
+    for a later download. Returns each term's records, or with JSON Lines results
+    only each term's item count.
+    """
+    scraper = get_scraper_backend(SETTINGS.SCRAPER_BACKEND)
+    return await asyncio.to_thread(
+        scraper.scrape_images,
         search_list,
-        max_search_result_size=SETTINGS.MAX_ITEMS_PER_SCRAPE)
-    scrape_results = ScraperResults(results=search_results_dict)
+        max_search_result_size=SETTINGS.MAX_ITEMS_PER_SCRAPE,
+        keep_results=keeps_scrape_results())
+
+
+def default_results_path() -> Path:
+    """
+    Where the scraper writes its results, given RESULTS_FORMAT and COMPRESS_RESULTS.
+    """
+    if SETTINGS.RESULTS_FORMAT == "jsonl":
+        return results_path(SETTINGS.COMPRESS_RESULTS)
+    return PATH_TO_RESULTS_JSON
+
+
+async def download(path_to_results: Path | None = None):
+    """
+    Only download, from the results file of an earlier scrape. Both the JSON Lines
+    results (gzipped or not) and a search_results.json are accepted.
+    """
+    path_to_results = path_to_results or default_results_path()
+    if not path_to_results.is_file():
+        raise FileNotFoundError(
+            f"No scrape results at {path_to_results}, run the scrape subcommand first.")
+    if path_to_results.suffix == ".json":
+        with open(path_to_results, "r") as file:
+            scrape_results = ScraperResults(results=json.load(file))
+        await DownloadImages(
+            scrape_results=scrape_results,
+            batch_size=SETTINGS.BATCH_SIZE).download_files()
+        return
+    await DownloadImages(batch_size=SETTINGS.BATCH_SIZE).download_results_file(path_to_results)
+
+
+async def scrape_and_download(search_list: list[str]):
+    """
+    Scrape the search terms and download the images, pipelined unless DEBUG_MODE is set.
+    """
+    if SETTINGS.PIPELINE_DOWNLOADS and not SETTINGS.DEBUG_MODE:
+        await scrape_and_download_pipelined(search_list)
+        return
+
+    search_results_dict = await scrape(search_list)
 
     if SETTINGS.DEBUG_MODE:
         print("Scrape Complete...")
         block_for_user_input()
 
+    if SETTINGS.RESULTS_FORMAT == "jsonl":
+        # Read the results back off disk rather than validating them all at once.
+        await download(default_results_path())
+        return
+
     await DownloadImages(
-        scrape_results=scrape_results,
+        scrape_results=search_results_dict,
         batch_size=SETTINGS.BATCH_SIZE).download_files()
+
+
+async def coordinate(search_list: list[str], wait: bool = False):
+    """
+    Put the search terms into the shared work queue for the workers. With wait,
+    print the queue's progress until every term is done or failed, then report
+    each term's result.
+    """
+    work_queue = open_work_queue()
+    try:
+        queued = work_queue.put(search_list)
+        print(f"Queued {queued} of {len(search_list)} search terms in {work_queue.path_to_queue}")
+        if not wait:
+            return
+        while work_queue.has_unfinished():
+            print(f"Work queue: {work_queue.counts()}")
+            await asyncio.sleep(SETTINGS.WORK_POLL_INTERVAL)
+        print("-" * 75)
+        for item in work_queue.items():
+            print(
+                f"{item.term} => {item.status} by {item.worker} after {item.attempts} attempt(s), "
+                f"{item.images} images saved, {item.failures} failed"
+                + (f" ({item.error})" if item.error else ""))
+    finally:
+        work_queue.close()
@@ -0,0 +1,79 @@
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+from .schemas import ManifestEntry
+
+PATH_TO_MANIFEST = Path(os.path.dirname(
+    __file__)) / ".." / "download_manifest.sqlite3"
+
+
+class DownloadManifest:
+    """
+    A persistent record of every image that has been downloaded, keyed by image URL.
+    Each row is written as soon as its image is safely on disk, so the manifest
+    doubles as the resume point for an interrupted run.
+    """
+
+    def __init__(self, path_to_manifest: Path = PATH_TO_MANIFEST):
+        """
+        path_to_manifest: Where the SQLite manifest lives. It is created if missing.
+        """
+        self.connection = sqlite3.connect(
+            path_to_manifest, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS downloads (
+                url TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                completed_at REAL NOT NULL
+            )
+            """)
+
+    def get(self, url: str) -> ManifestEntry | None:
+        """
+        Return the manifest entry for the url, or None if it was never downloaded.
+        """
+        row = self.connection.execute(
+            "SELECT url, path, size, sha256, etag, last_modified FROM downloads WHERE url = ?",
+            (url,)).fetchone()
+        if row is None:
+            return None
+        url, path, size, sha256, etag, last_modified = row
+        return ManifestEntry(
+            url=url,
+            path=path,
+            size=size,
+            sha256=sha256,
+            etag=etag,
+            last_modified=last_modified)
+
+    def record(self, entry: ManifestEntry):
+        """
+        Insert or replace the entry for a completed download.
+        """
+        self.connection.execute(
+            "INSERT OR REPLACE INTO downloads VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (entry.url, entry.path, entry.size, entry.sha256,
+             entry.etag, entry.last_modified, time.time()))
+
+    @staticmethod
+    def conditional_headers(entry: ManifestEntry) -> dict[str, str]:
+        """
+        Build the If-None-Match/If-Modified-Since headers for revalidating an entry.
+        """
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def close(self):
+        self.connection.close()
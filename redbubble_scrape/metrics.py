@@ -0,0 +1,132 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Lock
+from typing import Iterator
+import json
+import os
+import time
+
+PATH_TO_RUN_REPORT = Path(os.path.dirname(__file__)) / ".." / "run_report.jsonl"
+
+# Upper bounds (in seconds) of the histogram buckets, as in the Prometheus client defaults.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """
+    A fixed bucket histogram, along with the count, sum, min and max of every observation.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        # One extra bucket for observations above the largest bound (+Inf)
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+
+    def observe(self, value: float):
+        self.bucket_counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "min": self.min if self.count else 0.0,
+            "max": self.max if self.count else 0.0,
+            "buckets": dict(zip([*map(str, self.buckets), "+Inf"], self.bucket_counts)),
+        }
+
+
+class Metrics:
+    """
+    Counters and histograms shared by the scraper and downloader. Recording a value
+    is a dict lookup and a few additions under a lock, so it is cheap enough
+    to leave on, and safe to call from the scraper threads.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self.started_at = time.time()
+        self.counters: dict[str, float] = {}
+        self.histograms: dict[str, Histogram] = {}
+
+    def increment(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            if name not in self.histograms:
+                self.histograms[name] = Histogram()
+            self.histograms[name].observe(value)
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """
+        Observe how many seconds the block took, whether or not it raised.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            duration = time.time() - self.started_at
+            return {
+                "started_at": self.started_at,
+                "duration_seconds": duration,
+                "download_bytes_per_second": (
+                    self.counters.get("download_bytes_total", 0) / duration if duration else 0.0),
+                "counters": dict(self.counters),
+                "histograms": {
+                    name: histogram.to_dict() for name, histogram in self.histograms.items()},
+            }
+
+    def write_run_report(self, path_to_report: Path = PATH_TO_RUN_REPORT):
+        """
+        Append this run's metrics to the JSON Lines run report, one line per run.
+        """
+        with open(path_to_report, "a") as file:
+            file.write(json.dumps(self.snapshot()) + "\n")
+
+    def to_prometheus_text(self, prefix: str = "redbubble_scrape_") -> str:
+        """
+        Render the metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        with self._lock:
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"# TYPE {prefix}{name} counter")
+                lines.append(f"{prefix}{name} {value}")
+            for name, histogram in sorted(self.histograms.items()):
+                lines.append(f"# TYPE {prefix}{name} histogram")
+                cumulative = 0
+                for bound, bucket_count in zip(
+                        [*map(str, histogram.buckets), "+Inf"], histogram.bucket_counts):
+                    cumulative += bucket_count
+                    lines.append(f'{prefix}{name}_bucket{{le="{bound}"}} {cumulative}')
+                lines.append(f"{prefix}{name}_sum {histogram.sum}")
+                lines.append(f"{prefix}{name}_count {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus_textfile(self, path_to_textfile: Path):
+        """
+        Write the Prometheus text file atomically, as the node_exporter
+        textfile collector expects.
+        """
+        path_to_temp_file = path_to_textfile.with_name(f".{path_to_textfile.name}.tmp")
+        path_to_temp_file.write_text(self.to_prometheus_text())
+        os.replace(path_to_temp_file, path_to_textfile)
+
+
+METRICS = Metrics()
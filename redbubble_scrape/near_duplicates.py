@@ -0,0 +1,164 @@
+from pathlib import Path
+import json
+
+HASHES_FILE_NAME = "perceptual_hashes.jsonl"
+
+
+def hamming_distance(first: int, second: int) -> int:
+    return (first ^ second).bit_count()
+
+
+class MultiIndexHash:
+    """
+    Multi-index hashing over 64 bit perceptual hashes, for finding the nearest stored
+    hash by Hamming distance without comparing against every one.
+
+    Each hash is split into chunks (4 chunks of 16 bits by default), and each chunk
+    value is indexed in its own table. If two hashes are within max_distance, then by
+    the pigeonhole principle at least one of their chunks is within
+    max_distance // chunks of each other. So a lookup only probes each table at chunk
+    values that close to the query's, and only compares the full hashes found there.
+    """
+
+    def __init__(self, chunks: int = 4):
+        self.chunks = chunks
+        self.chunk_bits = 64 // chunks
+        self._tables: list[dict[int, list[int]]] = [{} for _ in range(chunks)]
+        self._hashes: list[int] = []
+        self._values: list = []
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def _split(self, perceptual_hash: int) -> list[int]:
+        mask = (1 << self.chunk_bits) - 1
+        return [(perceptual_hash >> (chunk * self.chunk_bits)) & mask for chunk in range(self.chunks)]
+
+    def add(self, perceptual_hash: int, value) -> int:
+        """
+        Index value under perceptual_hash, returning its entry number.
+        """
+        entry = len(self._hashes)
+        self._hashes.append(perceptual_hash)
+        self._values.append(value)
+        for table, chunk_value in zip(self._tables, self._split(perceptual_hash)):
+            table.setdefault(chunk_value, []).append(entry)
+        return entry
+
+    def replace(self, entry: int, value):
+        self._values[entry] = value
+
+    def remove(self, entry: int):
+        """
+        Leave entry out of future lookups. Its slot in the tables stays behind.
+        """
+        self._values[entry] = None
+
+    def _chunk_neighbours(self, chunk_value: int, radius: int) -> list[int]:
+        """
+        Every chunk value within radius bits of chunk_value.
+        """
+        neighbours = {chunk_value}
+        for _ in range(radius):
+            neighbours |= {
+                neighbour ^ (1 << bit) for neighbour in neighbours for bit in range(self.chunk_bits)}
+        return list(neighbours)
+
+    def nearest(self, perceptual_hash: int, max_distance: int) -> tuple[int, object] | None:
+        """
+        The (distance, value) of the closest hash within max_distance, if there is one.
+        """
+        radius = max_distance // self.chunks
+        best: tuple[int, object] | None = None
+        seen: set[int] = set()
+        for table, chunk_value in zip(self._tables, self._split(perceptual_hash)):
+            for neighbour in self._chunk_neighbours(chunk_value, radius):
+                for entry in table.get(neighbour, ()):
+                    if entry in seen:
+                        continue
+                    seen.add(entry)
+                    if self._values[entry] is None:
+                        continue
+                    distance = hamming_distance(perceptual_hash, self._hashes[entry])
+                    if distance <= max_distance and (best is None or distance < best[0]):
+                        best = (distance, self._values[entry])
+        return best
+
+
+class NearDuplicateIndex:
+    """
+    The perceptual hash of every stored image, built up as images download and saved to
+    perceptual_hashes.jsonl in the image folder so later runs start from it.
+
+    Images found to be near-duplicates of a stored design are saved to the same file
+    with the path they duplicate, so later runs can skip their URLs without a request.
+    """
+
+    def __init__(self, path_to_image_folder: Path):
+        self.path_to_image_folder = path_to_image_folder
+        self.path_to_index = path_to_image_folder / HASHES_FILE_NAME
+        self.table = MultiIndexHash()
+        # Maps each known duplicate's URL to the path of the design it duplicates
+        self.duplicate_urls: dict[str, str] = {}
+        self._load()
+        self._file = open(self.path_to_index, "a")
+
+    def _load(self):
+        if not self.path_to_index.is_file():
+            return
+        with open(self.path_to_index, "r") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get("duplicate_of"):
+                    self.duplicate_urls[record["url"]] = record["duplicate_of"]
+                else:
+                    self.table.add(int(record["hash"], 16), (record["path"], record.get("url")))
+
+    def reserve(self, perceptual_hash: str, path_to_image: Path, url: str) -> int:
+        """
+        Index an image that is about to be saved, so lookups made before it is
+        finally added already find it. Returns the reservation for add or release.
+        """
+        path = str(path_to_image.relative_to(self.path_to_image_folder))
+        return self.table.add(int(perceptual_hash, 16), (path, url))
+
+    def release(self, reservation: int):
+        """
+        Drop a reservation for an image that was not saved after all.
+        """
+        self.table.remove(reservation)
+
+    def add(self, perceptual_hash: str, path_to_image: Path, url: str, reservation: int | None = None):
+        """
+        Index a saved image and record it in perceptual_hashes.jsonl,
+        filling in its reservation if it has one.
+        """
+        path = str(path_to_image.relative_to(self.path_to_image_folder))
+        if reservation is None:
+            self.table.add(int(perceptual_hash, 16), (path, url))
+        else:
+            self.table.replace(reservation, (path, url))
+        self._file.write(json.dumps({"path": path, "url": url, "hash": perceptual_hash}) + "\n")
+
+    def find_duplicate(self, perceptual_hash: str, url: str, max_distance: int) -> str | None:
+        """
+        The path of a stored design from a different URL within max_distance
+        of perceptual_hash, if there is one. The same URL found under another
+        search term is not a duplicate.
+        """
+        match = self.table.nearest(int(perceptual_hash, 16), max_distance)
+        if match is None:
+            return None
+        path, match_url = match[1]
+        return path if match_url != url else None
+
+    def add_duplicate(self, perceptual_hash: str, url: str, duplicate_of: str):
+        self.duplicate_urls[url] = duplicate_of
+        self._file.write(json.dumps(
+            {"url": url, "hash": perceptual_hash, "duplicate_of": duplicate_of}) + "\n")
+
+    def close(self):
+        self._file.close()
@@ -0,0 +1,212 @@
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from pathlib import Path
+import asyncio
+import multiprocessing
+import os
+import time
+
+from .config import SETTINGS
+from .metrics import METRICS
+from .near_duplicates import NearDuplicateIndex
+
+
+def thumbnail_path(path_to_image: Path) -> Path:
+    return path_to_image.with_name(f"{path_to_image.stem}.thumb.jpg")
+
+
+def webp_path(path_to_image: Path) -> Path:
+    return path_to_image.with_suffix(".webp")
+
+
+def difference_hash(image) -> str:
+    """
+    The 64 bit dHash of a Pillow image, as 16 hex digits. The image is shrunk to 9x8
+    greyscale, and each bit says whether a pixel is brighter than its right hand neighbour,
+    so resizing, re-encoding and small edits leave most bits unchanged.
+    """
+    from PIL import Image
+
+    pixels = list(image.convert("L").resize((9, 8), Image.LANCZOS).getdata())
+    bits = 0
+    for row in range(8):
+        for column in range(8):
+            left = pixels[row * 9 + column]
+            right = pixels[row * 9 + column + 1]
+            bits = (bits << 1) | (left > right)
+    return f"{bits:016x}"
+
+
+def hash_image(source: bytes | str) -> str:
+    """
+    Runs in a worker process. The perceptual hash of the image in source.
+    """
+    from PIL import Image
+
+    with Image.open(BytesIO(source) if isinstance(source, bytes) else source) as image:
+        return difference_hash(image)
+
+
+def process_image(
+        source: bytes | str,
+        path_to_image: str,
+        thumbnail_size: int,
+        write_webp: bool,
+        webp_quality: int) -> str:
+    """
+    Runs in a worker process. Writes the thumbnail and optionally the WebP copy next
+    to path_to_image, and returns the image's perceptual hash. source is either the
+    downloaded bytes, or the path of a stored image when there are none in memory.
+    """
+    from PIL import Image
+
+    with Image.open(BytesIO(source) if isinstance(source, bytes) else source) as image:
+        image.load()
+        perceptual_hash = difference_hash(image)
+        rgb_image = image if image.mode in ("RGB", "L") else image.convert("RGB")
+        if write_webp:
+            _save_atomically(rgb_image, webp_path(Path(path_to_image)), "WEBP", quality=webp_quality)
+        thumbnail = rgb_image.copy()
+        thumbnail.thumbnail((thumbnail_size, thumbnail_size))
+        _save_atomically(thumbnail, thumbnail_path(Path(path_to_image)), "JPEG", quality=85)
+    return perceptual_hash
+
+
+def _pool_context():
+    """
+    Workers are started from a fork server (spawned where there is none) rather than forked
+    from this process, since by the time the pool starts the scraper threads, disk writer
+    threads and the METRICS lock are live, and a fork can copy a lock mid-use.
+    """
+    start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(start_method)
+
+
+def _save_atomically(image, path_to_output: Path, image_format: str, **params):
+    path_to_temp_file = path_to_output.with_name(f".{path_to_output.name}.tmp")
+    try:
+        image.save(path_to_temp_file, image_format, **params)
+        os.replace(path_to_temp_file, path_to_output)
+    finally:
+        path_to_temp_file.unlink(missing_ok=True)
+
+
+class PostProcessor:
+    """
+    Runs the CPU bound image work (thumbnails, WebP re-encodes and perceptual hashes)
+    for each downloaded image in a ProcessPoolExecutor, one worker per core by default.
+
+    At most max_pending images are queued or being processed at once. submit waits
+    for room rather than blocking, so when the pool falls behind, the download
+    workers slow down instead of the bytes piling up in memory. Perceptual hashes are
+    added to the near-duplicate index.
+
+    write_outputs: Whether to write thumbnails and WebP copies, or only hash images
+    (for SKIP_NEAR_DUPLICATES without POST_PROCESS_IMAGES)
+    """
+
+    def __init__(
+            self,
+            index: NearDuplicateIndex,
+            write_outputs: bool = True,
+            workers: int = 0,
+            max_pending: int = 0):
+        try:
+            import PIL  # noqa: F401
+        except ImportError as exc:
+            raise RuntimeError(
+                "POST_PROCESS_IMAGES and SKIP_NEAR_DUPLICATES need Pillow, "
+                "install it with 'pip install Pillow'") from exc
+        self.index = index
+        self.write_outputs = write_outputs
+        self.workers = workers or os.cpu_count() or 1
+        self._slots = asyncio.Semaphore(max_pending or self.workers * 2)
+        self._pending: set[asyncio.Task] = set()
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=_pool_context())
+
+    @staticmethod
+    def is_processed(path_to_image: Path) -> bool:
+        return thumbnail_path(path_to_image).is_file() and (
+            not SETTINGS.WRITE_WEBP or webp_path(path_to_image).is_file())
+
+    async def perceptual_hash(self, source: bytes | Path) -> str:
+        """
+        Hash one image in the pool, waiting for it.
+        """
+        async with self._slots:
+            with METRICS.timer("post_process_hash_seconds"):
+                return await asyncio.get_running_loop().run_in_executor(
+                    self._executor,
+                    hash_image,
+                    source if isinstance(source, bytes) else str(source))
+
+    async def submit(
+            self,
+            path_to_image: Path,
+            url: str,
+            source: bytes | Path,
+            perceptual_hash: str | None = None):
+        """
+        Queue path_to_image for processing, waiting while the pool is full.
+        Images processed by an earlier run are skipped unless the bytes are new.
+        perceptual_hash is given when the image was already hashed and indexed.
+        """
+        if not self.write_outputs and perceptual_hash:
+            return
+        if isinstance(source, Path) and self.is_processed(path_to_image):
+            METRICS.increment("post_process_skipped_total")
+            return
+        await self._slots.acquire()
+        task = asyncio.create_task(self._process(
+            path_to_image,
+            url,
+            source if isinstance(source, bytes) else str(source),
+            perceptual_hash))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _process(
+            self,
+            path_to_image: Path,
+            url: str,
+            source: bytes | str,
+            known_hash: str | None):
+        start = time.perf_counter()
+        try:
+            if self.write_outputs:
+                perceptual_hash = await asyncio.get_running_loop().run_in_executor(
+                    self._executor,
+                    process_image,
+                    source,
+                    str(path_to_image),
+                    SETTINGS.THUMBNAIL_SIZE,
+                    SETTINGS.WRITE_WEBP,
+                    SETTINGS.WEBP_QUALITY)
+            else:
+                perceptual_hash = await asyncio.get_running_loop().run_in_executor(
+                    self._executor, hash_image, source)
+        except Exception as exc:
+            METRICS.increment("post_process_failures_total")
+            print(f"Exception {exc} generated during post-processing of {path_to_image}")
+        else:
+            METRICS.increment("post_process_success_total")
+            METRICS.observe("post_process_seconds", time.perf_counter() - start)
+            if known_hash is None:
+                self.index.add(perceptual_hash, path_to_image, url)
+        finally:
+            self._slots.release()
+
+    async def join(self):
+        """
+        Wait for every submitted image to finish processing.
+        """
+        while self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+
+    def close(self):
+        """
+        Shut the worker processes down, dropping anything not yet processed.
+        """
+        for task in self._pending:
+            task.cancel()
+        self._executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,118 @@
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator
+import asyncio
+import datetime
+import random
+import time
+
+import httpx
+
+# Responses that mean the server is overloaded or throttling us, and are worth retrying.
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+
+def is_retryable(exc: Exception) -> bool:
+    """
+    Transport errors (timeouts, dropped connections) and throttling
+    or server error responses are transient. Anything else is not.
+    """
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(exc, httpx.TransportError)
+
+
+def parse_retry_after(res: httpx.Response) -> float | None:
+    """
+    Read a Retry-After header given either in seconds or as an HTTP date.
+    """
+    retry_after = res.headers.get("Retry-After")
+    if not retry_after:
+        return None
+    try:
+        return max(float(retry_after), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    return max((retry_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds(), 0.0)
+
+
+def backoff_delay(
+        exc: Exception,
+        attempt: int,
+        base: float,
+        max_delay: float) -> float:
+    """
+    How long to wait before retry number attempt (starting from 0). The server's
+    Retry-After is honoured when given, otherwise the delay is exponential
+    with full jitter, so that retrying workers do not all fire at once.
+    """
+    if isinstance(exc, httpx.HTTPStatusError):
+        if (retry_after := parse_retry_after(exc.response)) is not None:
+            return min(retry_after, max_delay)
+    return random.uniform(0, min(max_delay, base * 2 ** attempt))
+
+
+class AdaptiveLimiter:
+    """
+    An AIMD (additive increase, multiplicative decrease) concurrency limit.
+
+    Every healthy response raises the limit by 1/limit, so about one extra slot per
+    round of requests, up to maximum. A throttled, failed or slow response cuts the
+    limit by decrease_factor, at most once per cooldown so that one bad round of
+    requests only counts once. This keeps concurrency near what the server can take.
+    """
+
+    def __init__(
+            self,
+            initial: int,
+            maximum: int,
+            minimum: int = 1,
+            decrease_factor: float = 0.5,
+            latency_target: float | None = None,
+            cooldown: float = 1.0):
+        self.minimum = max(minimum, 1)
+        self.maximum = max(maximum, self.minimum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.decrease_factor = decrease_factor
+        self.latency_target = latency_target
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+
+    def _record(self, healthy: bool):
+        now = time.monotonic()
+        if healthy:
+            self.limit = min(self.limit + 1 / self.limit, self.maximum)
+        elif now - self._last_decrease >= self.cooldown:
+            self.limit = max(self.limit * self.decrease_factor, self.minimum)
+            self._last_decrease = now
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """
+        Wait for a free slot under the current limit. The request made inside the
+        block is counted as unhealthy if it raises a retryable error or takes longer
+        than latency_target.
+        """
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        start = time.perf_counter()
+        healthy = True
+        try:
+            yield
+        except Exception as exc:
+            healthy = not is_retryable(exc)
+            raise
+        finally:
+            if self.latency_target and time.perf_counter() - start > self.latency_target:
+                healthy = False
+            async with self._condition:
+                self.in_flight -= 1
+                self._record(healthy)
+                self._condition.notify_all()
@@ -1,20 +1,107 @@
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service as ChromiumService
-from webdriver_manager.chrome import ChromeDriverManager
-from webdriver_manager.core.utils import ChromeType
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException, WebDriverException
+from selenium.webdriver.support import expected_conditions
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.remote.webdriver import WebDriver
 from selenium.webdriver.remote.webelement import WebElement
 
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-import json
+from threading import Lock
+from typing import Iterator
+from urllib.parse import parse_qs, urlencode, urlsplit, urlunsplit
+import asyncio
 import os
 import time
 
-from .utils import wait_for_remote_container
+from .checkpoint import ScrapeCheckpoint
+from .driver_pool import DriverPool
+from .metrics import METRICS
+from .schemas import ImageRecord, TermProgress
+from .scraper_backend import PageScrapedCallback, ScrapeFunction, ScraperBackend
+from .utils import wait_for_remote_webdriver
 from .config import SETTINGS
 
+# The chromedriver path webdriver_manager resolved, reused for a day so that
+# starting a scrape does not have to ask it (and the network) every time.
+PATH_TO_DRIVER_CACHE = Path(os.path.dirname(__file__)) / ".." / ".chromedriver_path"
+DRIVER_CACHE_SECONDS = 24 * 60 * 60
+_driver_path_lock = Lock()
+_driver_path: str | None = None
+
+
+# Reads every tile of the results grid in a single WebDriver round trip.
+# Each tile is turned into metadata by ScraperBackend.parse_tile.
+BULK_EXTRACT_TILES_SCRIPT = """
+const grid = document.getElementById("SearchResultsGrid");
+if (!grid) {
+    return null;
+}
+return Array.from(grid.getElementsByTagName("a")).map((a) => {
+    const price = a.querySelector("span>span");
+    return {
+        price: price ? price.innerText.trim() : "",
+        texts: Array.from(a.getElementsByTagName("span"))
+            .map((span) => span.innerText.trim())
+            .filter((text) => text && !text.includes("$")),
+        srcs: Array.from(a.getElementsByTagName("img"))
+            .flatMap((img) => [
+                img.src,
+                img.dataset.src || "",
+                ...(img.getAttribute("srcset") || "").split(",")
+                    .map((candidate) => candidate.trim().split(/\\s+/)[0]),
+            ])
+            .filter((src) => src.endsWith(".jpg")),
+        displayed: a.getClientRects().length > 0,
+    };
+});
+"""
+
+
+# Scrolls through the whole results grid in viewport sized steps, pausing
+# arguments[0] milliseconds at each step so lazy images start loading,
+# then scrolls back to the top. Returns how many tiles still have no .jpg src.
+HYDRATE_LAZY_IMAGES_SCRIPT = """
+const [stepDelay, done] = [arguments[0], arguments[arguments.length - 1]];
+const grid = document.getElementById("SearchResultsGrid");
+if (!grid) {
+    done(0);
+    return;
+}
+const step = Math.max(window.innerHeight * 0.8, 200);
+const bottom = grid.getBoundingClientRect().bottom + window.scrollY;
+let y = grid.getBoundingClientRect().top + window.scrollY;
+const scrollStep = () => {
+    if (y >= bottom) {
+        window.scrollTo(0, 0);
+        done(Array.from(grid.getElementsByTagName("a")).filter((a) =>
+            !Array.from(a.getElementsByTagName("img")).some((img) => img.src.endsWith(".jpg"))
+        ).length);
+        return;
+    }
+    window.scrollTo(0, y);
+    y += step;
+    setTimeout(scrollStep, stepDelay);
+};
+scrollStep();
+"""
+
+
+# Whether the page says the search has no results (or no more of them),
+# with no tiles in the results grid.
+NO_RESULTS_SCRIPT = """
+const grid = document.getElementById("SearchResultsGrid");
+if (grid && grid.getElementsByTagName("a").length) {
+    return false;
+}
+return /couldn.t find any|no results/i.test(document.body ? document.body.innerText : "");
+"""
+
 
 class MaxScrapeCountReached(Exception):
     """
@@ -24,6 +111,14 @@ class MaxScrapeCountReached(Exception):
     ...
 
 
+class NoNextPage(RuntimeError):
+    """
+    Communicates that there is no 'Next' page
+    to move to, i.e. the results have run out.
+    """
+    ...
+
+
 class MissingImageMetadata(Exception):
     """
     Communicates that a scrape operation
@@ -33,17 +128,55 @@ class MissingImageMetadata(Exception):
     ...
 
 
-class ScrapeRedbubble:
+def chromedriver_path() -> str:
+    """
+    The local chromedriver binary: CHROMEDRIVER_PATH if set, otherwise the path
+    webdriver_manager installed it to, cached in memory and on disk.
+    webdriver_manager is only imported when the cache is missing or stale.
     """
+    global _driver_path
+    if SETTINGS.CHROMEDRIVER_PATH:
+        return SETTINGS.CHROMEDRIVER_PATH
+    with _driver_path_lock:
+        if _driver_path:
+            return _driver_path
+        if PATH_TO_DRIVER_CACHE.is_file() and (
+                time.time() - PATH_TO_DRIVER_CACHE.stat().st_mtime < DRIVER_CACHE_SECONDS):
+            cached_path = PATH_TO_DRIVER_CACHE.read_text().strip()
+            if os.path.isfile(cached_path):
+                _driver_path = cached_path
+                return _driver_path
+        from webdriver_manager.chrome import ChromeDriverManager
+        from webdriver_manager.core.utils import ChromeType
+        _driver_path = ChromeDriverManager(chrome_type=ChromeType.CHROMIUM).install()
+        PATH_TO_DRIVER_CACHE.write_text(_driver_path)
+        return _driver_path
+
+
+class ScrapeRedbubble(ScraperBackend):
+    """
+    The Selenium scraper backend.
     The Scrape_Redbubble class takes an array of search terms from the config.json file.
     It iterates over the array, puts the search term into the Redbubble search bar, 
     and records the desired number of results.
     """
 
-    @classmethod
-    def set_bot_driver(cls):
+    @staticmethod
+    def remote_webdriver_url() -> str:
+        """
+        If this UI_Bot is running in a container, then we cannot talk
+        to the remote_webdriver via localhost. Otherwise, use the name of the container
+        internally (see the docker-compose.yaml file.)
+        SELENIUM_REMOTE_URL overrides both, e.g. to point at a Selenium Grid.
+        """
+        return SETTINGS.SELENIUM_REMOTE_URL or (
+            'http://localhost:4444' if not SETTINGS.PYTHON_RUNNING_IN_CONTAINER
+            else "http://selenium_remote_webdriver:4444")
+
+    @staticmethod
+    def create_bot_driver() -> WebDriver:
         """
-        Set-up the Selenium Driver for usage. 
+        Set-up a Selenium Driver for usage, and navigate it to Redbubble.
 
         There are really 3 possible deployment configurations:
         1. Selenium Webdriver is downloaded onto the machine running this python script.
@@ -59,46 +192,87 @@ class ScrapeRedbubble:
 
         # If we are using a Remote Webdriver, the driver is set as such
         if SETTINGS.USE_REMOTE_WEBDRIVER:
-            # If this UI_Bot is running in a container, then we cannot talk
-            # to the remote_webdriver via localhost. Otherwise, use the name of the container
-            # internally (see the docker-compose.yaml file.)
-            remote_webdriver_url = (
-                'http://localhost:4444' if not SETTINGS.PYTHON_RUNNING_IN_CONTAINER
-                else "http://selenium_remote_webdriver:4444")
             print("Using the remote webdriver...")
             driver = webdriver.Remote(
-                command_executor=remote_webdriver_url,
+                command_executor=ScrapeRedbubble.remote_webdriver_url(),
                 options=options)
         else:
             print("Using the local webdriver...")
             driver = webdriver.Chrome(
-                service=ChromiumService(
-                    ChromeDriverManager(chrome_type=ChromeType.CHROMIUM).install()),
+                service=ChromiumService(chromedriver_path()),
                 options=options)
 
-        driver.implicitly_wait(15)
-        cls.driver = driver
+        # Elements are waited for explicitly, so a missing element should
+        # fail fast rather than block on the implicit wait.
+        driver.implicitly_wait(SETTINGS.IMPLICIT_WAIT_SECONDS)
+        ScrapeRedbubble.open_redbubble(driver)
+        return driver
 
-    @classmethod
-    def open_redbubble(cls):
+    @staticmethod
+    def open_redbubble(driver: WebDriver):
         """
         Navigates to redbubble.com and maximizes the window.
         """
-        cls.driver.get("https://www.redbubble.com/")
-        cls.driver.maximize_window()
+        driver.get("https://www.redbubble.com/")
+        driver.maximize_window()
 
     def __init__(
             self,
             search_input: str,
-            search_size_max: int):
+            search_size_max: int,
+            driver: WebDriver,
+            on_page_scraped: PageScrapedCallback | None = None,
+            checkpoint: ScrapeCheckpoint | None = None,
+            progress: TermProgress | None = None,
+            keep_results: bool = True):
         """
         search_input: The string being search in the Redbubble search bar
-        scraped_image_metadata: A list of all of the content from the scraper
         search_size_max: the max number of image metadata to scrape for the given search term
+        driver: The WebDriver session this search term has checked out of the pool
+        on_page_scraped: Optionally called with the search term and the new metadata
+        as soon as each results page is scraped
+        checkpoint: Optionally, the log each scraped page and the finished term are recorded to
+        progress: Optionally, this term's progress from an interrupted run. The scrape
+        carries on from the page after the last one recorded.
+        keep_results: Whether to keep the scraped metadata, or only count it
         """
+        self.driver = driver
+        self.on_page_scraped = on_page_scraped
+        self.checkpoint = checkpoint
         self.search_input = search_input
-        self.scraped_image_metadata = []
+        self._start_results(progress, keep_results)
+        # The results page currently being scraped
+        self.current_page = progress.last_page + 1 if progress else 1
         self.search_size_max = search_size_max
+        # Seconds spent on each results page, for timing feedback
+        self.page_timings: list[float] = []
+
+    def _wait(self, timeout: float | None = None) -> WebDriverWait:
+        return WebDriverWait(
+            self.driver,
+            SETTINGS.PAGE_LOAD_TIMEOUT if timeout is None else timeout,
+            poll_frequency=0.05)
+
+    def _wait_for_results_grid(self) -> bool:
+        """
+        Block until the search results grid has tiles in it, or the page says there are
+        no results. Returns whether there are results to scrape.
+        """
+        with METRICS.timer("scrape_page_load_seconds"):
+            return self._wait().until(self._results_state) == "results"
+
+    @staticmethod
+    def _results_state(driver: WebDriver) -> str | None:
+        if driver.find_elements(By.CSS_SELECTOR, "#SearchResultsGrid a"):
+            return "results"
+        if driver.execute_script(NO_RESULTS_SCRIPT):
+            return "no results"
+        return None
+
+    @staticmethod
+    def _first_tile_href(driver: WebDriver) -> str | None:
+        tiles = driver.find_elements(By.CSS_SELECTOR, "#SearchResultsGrid a")
+        return tiles[0].get_attribute("href") if tiles else None
 
     def _find_image_urls(self,
                          a_tag_element: WebElement) -> list:
@@ -107,19 +281,20 @@ class ScrapeRedbubble:
         iterate over the child <img/> tags, and try to find one whose
         src property ends with .jpg.
         """
-        return [web_element.get_property(
-                "src") for web_element in a_tag_element.find_elements(
-                By.TAG_NAME, "img") if web_element.get_property(
-                "src").endswith(".jpg")]
+        return [src for web_element in a_tag_element.find_elements(
+                By.TAG_NAME, "img") if (src := web_element.get_property(
+                "src") or "").endswith(".jpg")]
 
-    def _enter_search_term_into_searchbar(self):
+    def _enter_search_term_into_searchbar(self) -> bool:
         """
-        Enter the search into the search bar and press enter
+        Enter the search into the search bar and press enter.
+        Returns whether the search has any results.
         """
-        search_box = self.driver.find_element(
-            By.CSS_SELECTOR, "input[placeholder='Search designs and products']")
+        search_box = self._wait().until(expected_conditions.element_to_be_clickable(
+            (By.CSS_SELECTOR, "input[placeholder='Search designs and products']")))
         search_box.clear()
         search_box.send_keys(self.search_input + Keys.ENTER)
+        return self._wait_for_results_grid()
 
     def _get_image_url(
             self,
@@ -134,16 +309,15 @@ class ScrapeRedbubble:
         """
         image_urls = self._find_image_urls(a_tag_element)
         if not image_urls:
-            # Scroll the window down to cause images to render
+            # Scroll the window down to cause images to render,
+            # then wait for the .jpg src to be populated.
             self.driver.execute_script(
                 f"window.scrollTo(0, {a_tag_element.rect['y']});")
-            for _ in range(5):
-                # To avoid any rendering race conditions, we loop 5 times
-                # if we cannot find the .jpg src immediately
-                if image_urls := self._find_image_urls(a_tag_element):
-                    break
-                else:
-                    time.sleep(0.1)
+            try:
+                image_urls = self._wait(SETTINGS.IMAGE_SRC_TIMEOUT).until(
+                    lambda _: self._find_image_urls(a_tag_element))
+            except TimeoutException:
+                image_urls = []
         return image_urls
 
     def _get_grid_of_a_tags(self) -> list[WebElement]:
@@ -169,14 +343,15 @@ class ScrapeRedbubble:
         method _handle_pop_up is called from inside of _scrape_current_page_metadata.
         """
         if attempt < 3:
+            METRICS.increment("scrape_popup_retries_total")
             self.driver.refresh()
-            time.sleep(0.5)
+            self._wait_for_results_grid()
             self._scrape_current_page_metadata(attempt=attempt)
         else:
             raise MissingImageMetadata(
                 "Unable to find required metadata after 3 attempts.")
 
-    def _find_image_metadata_in_a_tag(self, a_tag: WebElement) -> dict | None:
+    def _find_image_metadata_in_a_tag(self, a_tag: WebElement) -> ImageRecord | None:
         """
         Given the parent <a/> representing a single image/poster element, 
         try to find the desired metadata: image_url, title, author, and price.
@@ -184,36 +359,72 @@ class ScrapeRedbubble:
         # Get the image_urls
         possible_image_url = self._get_image_url(a_tag)
         # Get the price
-        price = a_tag.find_element(By.CSS_SELECTOR, "span>span").text
+        price_elements = a_tag.find_elements(By.CSS_SELECTOR, "span>span")
+        price = price_elements[0].text if price_elements else ""
         # Get the poster name and author
         poster_name_and_author = [span_web_element.text for span_web_element in a_tag.find_elements(
             By.TAG_NAME, "span") if (span_web_element.text and "$" not in span_web_element.text)]
 
-        if all((len(poster_name_and_author) == 2, price, possible_image_url)):
-            poster_name, poster_author = poster_name_and_author
-            return {
-                "title": poster_name,
-                "url": possible_image_url[0],
-                "price": price,
-                "author": poster_author
-            }
+        return self.parse_tile({
+            "price": price,
+            "texts": poster_name_and_author,
+            "srcs": possible_image_url
+        })
+
+    def _hydrate_lazy_images(self):
+        """
+        Trigger lazy loading for the whole grid in one stepped scroll, so that
+        _get_image_url only has to scroll to individual tiles as a last resort.
+        """
+        try:
+            with METRICS.timer("scrape_hydration_seconds"):
+                self.driver.execute_async_script(
+                    HYDRATE_LAZY_IMAGES_SCRIPT, SETTINGS.HYDRATION_SCROLL_DELAY_MS)
+        except WebDriverException:
+            METRICS.increment("scrape_hydration_failures_total")
+
+    def _bulk_extract_tiles(self) -> list[dict] | None:
+        """
+        Pull the raw price, texts, image srcs and visibility of every tile
+        in the grid with one execute_script call, instead of several WebDriver
+        round trips per tile. Returns None if the script could not run.
+        """
+        try:
+            return self.driver.execute_script(BULK_EXTRACT_TILES_SCRIPT)
+        except WebDriverException:
+            return None
 
     def _scrape_current_page_metadata(self, attempt=0):
         """
         Scrape the Current Page's metadata.
 
+        With HYDRATE_LAZY_IMAGES, the whole grid is scrolled through once first
+        so that lazy images are loaded before extraction starts.
+        With USE_BULK_DOM_EXTRACTION, every tile is read with a single script
+        first, and only tiles it could not parse (usually an image that has not
+        lazy loaded yet) go through the per element path.
+
         If during the loop the max items is acquired, 
         MaxScrapeCountReached Exception is raised.
         """
+        if SETTINGS.HYDRATE_LAZY_IMAGES:
+            self._hydrate_lazy_images()
         grid_of_parent_a_tags = self._get_grid_of_a_tags()
+        bulk_tiles = (self._bulk_extract_tiles() or []
+                      if SETTINGS.USE_BULK_DOM_EXTRACTION else [])
         this_page_scraped_metadata = []
-        for a_tag in grid_of_parent_a_tags:
-            if len(self.scraped_image_metadata) + len(this_page_scraped_metadata) >= self.search_size_max:
-                self.scraped_image_metadata.extend(this_page_scraped_metadata)
+        for index, a_tag in enumerate(grid_of_parent_a_tags):
+            if self.items_scraped + len(this_page_scraped_metadata) >= self.search_size_max:
+                self._record_page_metadata(this_page_scraped_metadata)
                 raise MaxScrapeCountReached(
                     f"Scrape for {self.search_input} reached max size.")
 
-            if parsed_metadata := self._find_image_metadata_in_a_tag(a_tag):
+            METRICS.increment("scrape_tiles_total")
+            bulk_tile = bulk_tiles[index] if index < len(bulk_tiles) else None
+            parsed_metadata = self.parse_tile(bulk_tile) if bulk_tile else None
+            if not parsed_metadata:
+                METRICS.increment("scrape_tile_fallbacks_total")
+            if parsed_metadata or (parsed_metadata := self._find_image_metadata_in_a_tag(a_tag)):
                 this_page_scraped_metadata.append(parsed_metadata)
             elif not a_tag.is_displayed():
                 # if the <a/> is not displayed, then a pop-up is blocking
@@ -224,7 +435,23 @@ class ScrapeRedbubble:
                 # If not a popup, then a refresh will not solve the issue.
                 # Ignore the <a/> in question and move on to the next one.
                 continue
-        self.scraped_image_metadata.extend(this_page_scraped_metadata)
+        self._record_page_metadata(this_page_scraped_metadata)
+
+    def _record_page_metadata(self, this_page_scraped_metadata: list[ImageRecord]):
+        """
+        Add a finished page's metadata to the results and the checkpoint, and hand it
+        to on_page_scraped so downloads can start straight away.
+        """
+        self._add_results(this_page_scraped_metadata)
+        if self.checkpoint:
+            self.checkpoint.record_page(
+                self.search_input, self.current_page, this_page_scraped_metadata)
+        if self.on_page_scraped and this_page_scraped_metadata:
+            self.on_page_scraped(self.search_input, this_page_scraped_metadata)
+
+    def _record_done(self):
+        if self.checkpoint:
+            self.checkpoint.record_done(self.search_input)
 
     def _move_to_next_page(self):
         """
@@ -242,74 +469,173 @@ class ScrapeRedbubble:
                 if child_strong_elements.pop().text == "Next":
                     # If the a_tag has a <strong/> child with text "Next",
                     # click on it.
+                    old_grid = self.driver.find_element(By.ID, "SearchResultsGrid")
+                    old_first_tile_href = self._first_tile_href(self.driver)
                     possible_next_a_tag.click()
-                    # Give the Browser time to load the next page
+                    METRICS.increment("scrape_next_clicks_total")
+                    # Wait for the next page to replace the grid (or its tiles)
                     # or you can get a stale element exception.
-                    time.sleep(0.75)
+                    with METRICS.timer("scrape_page_load_seconds"):
+                        self._wait().until(lambda driver: self._next_page_loaded(
+                            driver, old_grid, old_first_tile_href))
+                    self.current_page += 1
                     return
 
-        raise RuntimeError("Unable to click next page...")
+        raise NoNextPage("Unable to click next page...")
 
-    def search_and_scrape_pictures(self) -> list[dict[str, str]]:
+    def _go_to_page(self, page: int) -> bool:
+        """
+        Jump straight to a results page by its URL, used when
+        resuming a search term part way through. Returns whether the page has results.
+        """
+        scheme, netloc, path, query, fragment = urlsplit(self.driver.current_url)
+        query_params = parse_qs(query)
+        query_params["page"] = [str(page)]
+        self.driver.get(urlunsplit(
+            (scheme, netloc, path, urlencode(query_params, doseq=True), fragment)))
+        return self._wait_for_results_grid()
+
+    @classmethod
+    def _next_page_loaded(
+            cls,
+            driver: WebDriver,
+            old_grid: WebElement,
+            old_first_tile_href: str | None) -> bool:
+        """
+        The next page has loaded once the old grid has gone stale, or has been
+        re-rendered in place with different tiles, and the new grid has tiles.
+        """
+        try:
+            first_tile_href = cls._first_tile_href(driver)
+            if not first_tile_href:
+                return False
+            if expected_conditions.staleness_of(old_grid)(driver):
+                return True
+            return first_tile_href != old_first_tile_href
+        except StaleElementReferenceException:
+            return False
+
+    def search_and_scrape_pictures(self) -> list[ImageRecord] | int:
         """
         Performs all of the necessary scraping operations for a single 
-        search term.
+        search term. Anything that goes wrong part way through (a timeout, a dead
+        session) is raised, so the term counts as failed rather than finished.
+        A search with no results is finished, with no items.
         """
         try:
-            self._enter_search_term_into_searchbar()
+            has_results = self._enter_search_term_into_searchbar()
+            if has_results and self.current_page > 1:
+                has_results = self._go_to_page(self.current_page)
+            if not has_results:
+                self._record_done()
             # Iterate over the a tags and get the img src, price and general info
-            while True:
+            while has_results:
+                page_start = time.perf_counter()
                 try:
-                    self._scrape_current_page_metadata()
+                    with METRICS.timer("scrape_tile_extraction_seconds"):
+                        self._scrape_current_page_metadata()
                     self._move_to_next_page()
-                except MaxScrapeCountReached:
+                except (MaxScrapeCountReached, NoNextPage):
+                    # Either way, this search term is finished.
+                    self._record_done()
                     break
+                finally:
+                    self.page_timings.append(time.perf_counter() - page_start)
+                    METRICS.observe("scrape_page_seconds", self.page_timings[-1])
         finally:
-            self.driver.get("https://www.redbubble.com/")
+            average_page_time = (
+                sum(self.page_timings) / len(self.page_timings) if self.page_timings else 0.0)
+            METRICS.increment("scrape_items_total", self.items_scraped)
             print(
-                f"{self.search_input} => got {len(self.scraped_image_metadata)} items from scrape")
-            return self.scraped_image_metadata
+                f"{self.search_input} => got {self.items_scraped} items from scrape "
+                f"over {len(self.page_timings)} pages ({average_page_time:.2f}s per page)")
+            try:
+                self.driver.get("https://www.redbubble.com/")
+            except WebDriverException:
+                # A dead session must not hide the exception that killed it.
+                pass
+        return self.results()
 
-    @staticmethod
-    def write_results_to_json(scrape_results: dict):
+    @classmethod
+    def _scrape_search_term(
+            cls,
+            driver_pool: DriverPool,
+            search_term: str,
+            max_search_result_size: int,
+            on_page_scraped: PageScrapedCallback | None,
+            checkpoint: ScrapeCheckpoint,
+            progress: TermProgress | None,
+            keep_results: bool) -> list[ImageRecord] | int:
         """
-        Write the Results to file search_results.json for debugging 
-        and also in case further analysis is desired.
+        Scrape a single search term on a session checked out of the pool.
+        Runs on one of the scrape_images worker threads.
         """
-        json_file_path = Path(os.path.dirname(
-            __file__)) / ".." / "search_results.json"
-        with open(json_file_path, "w") as file:
-            json.dump(scrape_results, file, indent=2)
+        cls.replay_progress(search_term, progress, on_page_scraped)
+        if progress and progress.done:
+            print(f"{search_term} => already scraped, resuming with {len(progress.items)} items")
+            return cls.finished_results(progress, keep_results)
+        with driver_pool.session() as driver:
+            return cls(
+                search_input=search_term,
+                search_size_max=max_search_result_size,
+                driver=driver,
+                on_page_scraped=on_page_scraped,
+                checkpoint=checkpoint,
+                progress=progress,
+                keep_results=keep_results).search_and_scrape_pictures()
 
     @classmethod
-    def scrape_images(
+    @contextmanager
+    def open_session(
             cls,
-            search_list: list[str],
-            max_search_result_size: int = 15) -> dict:
+            max_search_result_size: int = 15,
+            on_page_scraped: PageScrapedCallback | None = None,
+            keep_results: bool = True) -> Iterator[ScrapeFunction]:
         """
-        Class Method that runs the scraper for the given set of search terms.
+        Up to SCRAPER_SESSIONS search terms are scraped at once, each on its own
+        WebDriver session from a pool kept open for the whole session.
+        on_page_scraped is passed on to every search term's scraper.
+        Every scraped page is checkpointed, and with RESUME_SCRAPE set the previous
+        run's finished terms are skipped and unfinished ones carry on where they stopped.
         """
-        print("-" * 75)
-        scrape_results = {}
-        # If Running in Container, make sure the remote webdriver is up
+        checkpoint, progress_by_term = cls.open_checkpoint()
+        # If Running in Container, make sure the remote webdriver is up.
+        # Sessions are opened on a thread of their own, so this can run its own event loop.
         if SETTINGS.PYTHON_RUNNING_IN_CONTAINER and SETTINGS.USE_REMOTE_WEBDRIVER:
-            wait_for_remote_container()
-
-        cls.set_bot_driver()
-        cls.open_redbubble()
+            asyncio.run(wait_for_remote_webdriver(
+                cls.remote_webdriver_url(), SETTINGS.REMOTE_WEBDRIVER_TIMEOUT))
+
+        driver_pool = DriverPool(
+            size=SETTINGS.SCRAPER_SESSIONS,
+            driver_factory=cls.create_bot_driver)
+        with cls.open_results_sink(on_page_scraped) as on_page_scraped:
+            def scrape(search_list: list[str]) -> dict:
+                scrape_results = {}
+                with ThreadPoolExecutor(max_workers=driver_pool.size) as executor:
+                    futures = {
+                        search_term: executor.submit(
+                            cls._scrape_search_term,
+                            driver_pool,
+                            search_term,
+                            max_search_result_size,
+                            on_page_scraped,
+                            checkpoint,
+                            progress_by_term.get(search_term),
+                            keep_results)
+                        for search_term in search_list}
+                    # Get the Image Urls and associated metadata, in the order of search_list
+                    for search_term, future in futures.items():
+                        try:
+                            scrape_results[search_term] = future.result()
+                        except Exception as exc:
+                            METRICS.increment("scrape_failures_total")
+                            print(f"Uncaught exception: {exc} for: {search_term}")
+                return scrape_results
 
-        # Get the Image Urls and associated metadata
-        for search_term in search_list:
             try:
-                scrape_results[search_term] = cls(
-                    search_input=search_term,
-                    search_size_max=max_search_result_size).search_and_scrape_pictures()
-            except Exception as exc:
-                print(f"Uncaught exception: {exc} for: {search_term}")
-
-        cls.driver.quit()
-        cls.write_results_to_json(scrape_results)
-        return scrape_results
+                yield scrape
+            finally:
+                driver_pool.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,80 @@
+from pathlib import Path
+from threading import Lock
+from typing import IO, Iterator
+import gzip
+import json
+import os
+
+from .schemas import ImageRecord
+
+PATH_TO_RESULTS_JSONL = Path(os.path.dirname(__file__)) / ".." / "search_results.jsonl"
+
+
+def results_path(compress: bool) -> Path:
+    """
+    Where the JSON Lines results are written, with a .gz suffix when compressed.
+    """
+    if compress:
+        return PATH_TO_RESULTS_JSONL.with_name(PATH_TO_RESULTS_JSONL.name + ".gz")
+    return PATH_TO_RESULTS_JSONL
+
+
+def _open_text(path: Path, mode: str) -> IO[str]:
+    if path.suffix == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class ResultsSink:
+    """
+    Writes scrape results as JSON Lines while the scrape runs, one line per image:
+    the image metadata plus the search term it was found under. Nothing is held
+    in memory beyond the page being written, so the run size does not matter.
+    Opening the sink starts a fresh file.
+    """
+
+    def __init__(self, path_to_results: Path):
+        self.path_to_results = path_to_results
+        self._file: IO[str] | None = None
+        # Selenium search terms are scraped from several threads at once.
+        self._lock = Lock()
+
+    def __enter__(self) -> "ResultsSink":
+        self._file = _open_text(self.path_to_results, "w")
+        return self
+
+    def __exit__(self, *exc_info):
+        with self._lock:
+            self._file.close()
+            self._file = None
+
+    def write_page(self, search_term: str, page_metadata: list[ImageRecord]):
+        lines = "".join(
+            json.dumps({"search": search_term, **record.to_dict()}) + "\n"
+            for record in page_metadata)
+        with self._lock:
+            self._file.write(lines)
+            # Flushed per page, so a consumer reading the file sees whole pages
+            self._file.flush()
+
+
+def iter_results(path_to_results: Path) -> Iterator[tuple[str, ImageRecord]]:
+    """
+    Stream (search_name, metadata) pairs back out of a JSON Lines results file,
+    validating one record at a time. A torn last line, from a crash mid-write, is skipped,
+    as are records that do not validate.
+    """
+    with _open_text(path_to_results, "r") as file:
+        try:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                search_name = record.pop("search", None) if isinstance(record, dict) else None
+                image_metadata = ImageRecord.from_dict_or_none(record)
+                if isinstance(search_name, str) and image_metadata is not None:
+                    yield search_name, image_metadata
+        except EOFError:
+            # A truncated gzip stream
+            return
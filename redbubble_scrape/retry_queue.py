@@ -0,0 +1,75 @@
+from pathlib import Path
+import json
+import os
+
+from .schemas import ImageRecord
+
+PATH_TO_RETRY_QUEUE = Path(os.path.dirname(__file__)) / ".." / "failed_downloads.jsonl"
+
+
+class RetryQueue:
+    """
+    Downloads that still failed with a transient error after every retry are
+    saved to disk, one JSON line each, and queued again at the start of the next run.
+
+    Items loaded from the previous run stay outstanding until their download finishes,
+    so a run that stops early saves them again along with its own failures.
+    """
+
+    def __init__(self, path_to_queue: Path = PATH_TO_RETRY_QUEUE):
+        self.path_to_queue = path_to_queue
+        self.failed: list[dict] = []
+        # Keyed by the id of the loaded record, which is kept alive alongside
+        # the saved line so the id cannot be reused while it is outstanding.
+        self.outstanding: dict[int, tuple[ImageRecord, dict]] = {}
+
+    def load(self) -> list[tuple[str, ImageRecord]]:
+        """
+        Return the (search_name, metadata) pairs saved by the previous run, each
+        outstanding until passed to finish. Torn lines and records that do not validate are skipped.
+        """
+        if not self.path_to_queue.is_file():
+            return []
+        pairs = []
+        with open(self.path_to_queue, "r") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if not isinstance(record, dict) or not isinstance(record.get("search"), str):
+                    continue
+                image_metadata = ImageRecord.from_dict_or_none(record.get("metadata"))
+                if image_metadata is not None:
+                    self.outstanding[id(image_metadata)] = (image_metadata, record)
+                    pairs.append((record["search"], image_metadata))
+        return pairs
+
+    def finish(self, image_metadata: ImageRecord):
+        """
+        Mark a loaded item as done with, whether it downloaded or failed again.
+        Anything else is ignored.
+        """
+        self.outstanding.pop(id(image_metadata), None)
+
+    def add(self, search_name: str, image_metadata: ImageRecord, exc: Exception):
+        self.failed.append({
+            "search": search_name,
+            "metadata": image_metadata.to_dict(),
+            "error": f"{type(exc).__name__}: {exc}",
+        })
+
+    def save(self):
+        """
+        Replace the saved queue with the loaded items still outstanding and this
+        run's failures. Items loaded from the previous run that succeeded this time are dropped.
+        """
+        records = [record for _, record in self.outstanding.values()] + self.failed
+        if not records:
+            self.path_to_queue.unlink(missing_ok=True)
+            return
+        path_to_temp_file = self.path_to_queue.with_name(f".{self.path_to_queue.name}.tmp")
+        with open(path_to_temp_file, "w") as file:
+            for record in records:
+                file.write(json.dumps(record) + "\n")
+        os.replace(path_to_temp_file, self.path_to_queue)
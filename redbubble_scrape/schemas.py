@@ -1,5 +1,15 @@
+from functools import lru_cache
+import re
+import sys
+
 from pydantic import BaseModel
 
+from .metrics import METRICS
+
+PRICE_PATTERN = re.compile(
+    r"(?P<prefix>[^\d\s]*)\s?(?P<amount>\d(?:[\d.,]*\d)?)\s?(?P<suffix>[^\d\s]*)")
+STRING_SANITIZE_PATTERN = re.compile(r"[^\s\w]")
+
 
 class ImageMetadata(BaseModel):
     title: str
@@ -10,3 +20,169 @@ class ImageMetadata(BaseModel):
 
 class ScraperResults(BaseModel):
     results: dict[str, list[ImageMetadata]]
+
+    def to_records(self) -> dict[str, list["ImageRecord"]]:
+        return {
+            search_name: [
+                record for image_metadata in search_results
+                if (record := ImageRecord.from_dict_or_none(image_metadata.dict())) is not None]
+            for search_name, search_results in self.results.items()}
+
+
+def parse_price(price_text: str) -> tuple[float, str]:
+    """
+    Split a price such as "$14.99", "US$ 14.99" or "14,99 €" into its amount and currency.
+    A comma followed by exactly two digits is taken as the decimal separator,
+    any other commas as thousands separators.
+    """
+    match = PRICE_PATTERN.search(price_text)
+    if not match:
+        raise ValueError(f"Unable to parse price: {price_text!r}")
+    amount = match["amount"]
+    if "," in amount and "." in amount:
+        decimal_separator = "," if amount.rfind(",") > amount.rfind(".") else "."
+    elif re.search(r",\d\d$", amount):
+        decimal_separator = ","
+    else:
+        decimal_separator = "."
+    thousands_separator = "." if decimal_separator == "," else ","
+    amount = amount.replace(thousands_separator, "").replace(decimal_separator, ".")
+    return float(amount), sys.intern(match["prefix"] or match["suffix"])
+
+
+def sanitize_string(string: str, repl: str = "_") -> str:
+    """
+    Remove any non-alphanumeric characters from the author/titles,
+    as these will likely cause an OS exception for an invalid filename.
+    """
+    return STRING_SANITIZE_PATTERN.sub(repl, string)
+
+
+@lru_cache(maxsize=4096)
+def _sanitized_author(author: str) -> str:
+    # Authors repeat across many images, so each is only sanitized once.
+    return sanitize_string(author)
+
+
+class ImageRecord:
+    """
+    The compact form of one image's metadata, used on the hot path between the
+    scraper and the downloader instead of a dict or an ImageMetadata model.
+
+    The price is kept parsed into its amount and currency, and the author and
+    currency strings are interned since they repeat across many images.
+    Records are only validated where they enter the program, in from_dict.
+    The sanitized file name is worked out the first time it is needed and kept,
+    rather than held by every record from the start.
+    """
+    FIELDS = ("title", "url", "price", "currency", "author")
+    __slots__ = FIELDS + ("_file_name",)
+
+    def __init__(self, title: str, url: str, price: float, currency: str, author: str):
+        self.title = title
+        self.url = url
+        self.price = price
+        self.currency = currency
+        self.author = sys.intern(author)
+        self._file_name: str | None = None
+
+    @classmethod
+    def from_scraped(cls, title: str, url: str, price_text: str, author: str) -> "ImageRecord":
+        """
+        Build a record from the raw texts of a search result tile.
+        """
+        price, currency = parse_price(price_text)
+        return cls(title, url, price, currency, author)
+
+    @classmethod
+    def from_dict(cls, image_metadata: dict) -> "ImageRecord":
+        """
+        Validate a dict in the ImageMetadata shape, e.g. read back from a file.
+        Raises ValueError for anything missing or not a string, or a price that cannot be parsed.
+        """
+        if not isinstance(image_metadata, dict):
+            raise ValueError(f"ImageMetadata must be an object, got {image_metadata!r}")
+        fields = {}
+        for field in ("title", "url", "price", "author"):
+            value = image_metadata.get(field)
+            if not isinstance(value, str):
+                raise ValueError(f"ImageMetadata field {field!r} must be a string, got {value!r}")
+            fields[field] = value
+        return cls.from_scraped(fields["title"], fields["url"], fields["price"], fields["author"])
+
+    @classmethod
+    def from_dict_or_none(cls, image_metadata: dict) -> "ImageRecord | None":
+        """
+        Like from_dict, but a record that does not validate (e.g. priced "Sold out")
+        is counted in invalid_records_total and skipped by returning None, so one
+        bad record never stops a whole download.
+        """
+        try:
+            return cls.from_dict(image_metadata)
+        except ValueError as exc:
+            METRICS.increment("invalid_records_total")
+            print(f"Skipping invalid image metadata: {exc}")
+            return None
+
+    @property
+    def file_name(self) -> str:
+        """
+        The `{title}_{author}.{extension}` file name for the image.
+        """
+        if self._file_name is None:
+            extension = self.url.split('.')[-1]
+            self._file_name = f"{sanitize_string(self.title)}_{_sanitized_author(self.author)}.{extension}"
+        return self._file_name
+
+    @property
+    def price_text(self) -> str:
+        return f"{self.currency}{self.price:.2f}"
+
+    def to_dict(self) -> dict[str, str]:
+        """
+        The record in the ImageMetadata shape, for writing out as JSON.
+        """
+        return {
+            "title": self.title,
+            "url": self.url,
+            "price": self.price_text,
+            "author": self.author
+        }
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ImageRecord):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self.FIELDS)
+
+    def __repr__(self) -> str:
+        return f"ImageRecord({', '.join(f'{field}={getattr(self, field)!r}' for field in self.FIELDS)})"
+
+
+class ManifestEntry(BaseModel):
+    url: str
+    path: str
+    size: int
+    sha256: str
+    etag: str | None = None
+    last_modified: str | None = None
+
+
+class TermProgress(BaseModel):
+    items: list[dict[str, str]] = []
+    last_page: int = 0
+    done: bool = False
+
+    def records(self) -> list[ImageRecord]:
+        return [
+            record for image_metadata in self.items
+            if (record := ImageRecord.from_dict_or_none(image_metadata)) is not None]
+
+
+class WorkItem(BaseModel):
+    term: str
+    status: str
+    worker: str | None = None
+    attempts: int = 0
+    images: int = 0
+    failures: int = 0
+    error: str | None = None
@@ -0,0 +1,177 @@
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, ContextManager, Iterator
+import json
+import os
+
+from .checkpoint import ScrapeCheckpoint
+from .config import SETTINGS
+from .results_sink import ResultsSink, results_path
+from .schemas import ImageRecord, TermProgress
+
+PageScrapedCallback = Callable[[str, list[ImageRecord]], None]
+# Scrapes a list of search terms with an open session
+ScrapeFunction = Callable[[list[str]], dict]
+
+PATH_TO_RESULTS_JSON = Path(os.path.dirname(__file__)) / ".." / "search_results.json"
+
+
+class ScraperBackend(ABC):
+    """
+    The interface every scraper backend implements. A backend takes the list
+    of search terms and returns a dict mapping each term to its list of
+    ImageRecords (title, url, price, currency, author), or with keep_results
+    off, to only how many it scraped.
+    """
+
+    @classmethod
+    def scrape_images(
+            cls,
+            search_list: list[str],
+            max_search_result_size: int = 15,
+            on_page_scraped: PageScrapedCallback | None = None,
+            keep_results: bool = True) -> dict:
+        """
+        Run the scraper for the given set of search terms. If given, on_page_scraped
+        is called with the search term and each page's metadata as soon as it is scraped.
+        With keep_results off, nothing is held onto beyond the page being scraped, and
+        each term maps to its item count. For when the pages go to on_page_scraped
+        or the results sink, so memory stays bounded however big the run is.
+        Search terms that failed are left out.
+        """
+        print("-" * 75)
+        with cls.open_session(max_search_result_size, on_page_scraped, keep_results) as scrape:
+            scrape_results = scrape(search_list)
+        if SETTINGS.RESULTS_FORMAT == "json" and keep_results:
+            cls.write_results_to_json(scrape_results)
+        return scrape_results
+
+    @classmethod
+    @abstractmethod
+    def open_session(
+            cls,
+            max_search_result_size: int = 15,
+            on_page_scraped: PageScrapedCallback | None = None,
+            keep_results: bool = True) -> ContextManager[ScrapeFunction]:
+        """
+        Open everything the scraper needs (the checkpoint, the results sink and, for
+        Selenium, the browsers) once, and yield a function that scrapes a list of search
+        terms with it, returning results as scrape_images does. A worker scrapes term
+        after term with one session, rather than starting the browsers over each time.
+        """
+        ...
+
+    def _start_results(self, progress: TermProgress | None, keep_results: bool):
+        """
+        Set up a search term scraper's results, carrying on from progress if resuming.
+        """
+        self.keep_results = keep_results
+        self.items_scraped = len(progress.items) if progress else 0
+        self.scraped_image_metadata = progress.records() if progress and keep_results else []
+
+    def _add_results(self, page_metadata: list[ImageRecord]):
+        self.items_scraped += len(page_metadata)
+        if self.keep_results:
+            self.scraped_image_metadata.extend(page_metadata)
+
+    def results(self) -> list[ImageRecord] | int:
+        """
+        The search term's records, or only how many there were without keep_results.
+        """
+        return self.scraped_image_metadata if self.keep_results else self.items_scraped
+
+    @staticmethod
+    def finished_results(progress: TermProgress, keep_results: bool) -> list[ImageRecord] | int:
+        """
+        The results of a search term the checkpoint has as finished.
+        """
+        return progress.records() if keep_results else len(progress.items)
+
+    @staticmethod
+    def parse_tile(tile: dict) -> ImageRecord | None:
+        """
+        Turn the raw contents of one search result tile into image metadata.
+        A tile is a dict with the tile's price text, its non-price span texts and its .jpg
+        image srcs. The span texts must be exactly the title and author.
+        """
+        if all((len(tile["texts"]) == 2, tile["price"], tile["srcs"])):
+            poster_name, poster_author = tile["texts"]
+            try:
+                return ImageRecord.from_scraped(
+                    title=poster_name,
+                    url=tile["srcs"][0],
+                    price_text=tile["price"],
+                    author=poster_author)
+            except ValueError:
+                return None
+
+    @staticmethod
+    def open_checkpoint() -> tuple[ScrapeCheckpoint, dict[str, TermProgress]]:
+        """
+        Open the scrape checkpoint log, and return it along with each search term's
+        progress from the previous run when RESUME_SCRAPE is set. Otherwise the log
+        is started afresh.
+        """
+        checkpoint = ScrapeCheckpoint()
+        if SETTINGS.RESUME_SCRAPE:
+            return checkpoint, checkpoint.load()
+        checkpoint.reset()
+        return checkpoint, {}
+
+    @staticmethod
+    def replay_progress(
+            search_term: str,
+            progress: TermProgress | None,
+            on_page_scraped: PageScrapedCallback | None):
+        """
+        Hand the metadata a resumed search term already has to on_page_scraped, so a
+        pipelined download still gets it. The download manifest skips anything
+        that was downloaded before the crash.
+        """
+        if progress and progress.items and on_page_scraped:
+            on_page_scraped(search_term, progress.records())
+
+    @staticmethod
+    @contextmanager
+    def open_results_sink(
+            on_page_scraped: PageScrapedCallback | None) -> Iterator[PageScrapedCallback | None]:
+        """
+        With RESULTS_FORMAT "jsonl", stream every scraped page to search_results.jsonl
+        (gzipped if COMPRESS_RESULTS is set) before handing it on to on_page_scraped.
+        Yields the callback the scraper should call for each page.
+        """
+        if SETTINGS.RESULTS_FORMAT != "jsonl":
+            yield on_page_scraped
+            return
+        with ResultsSink(results_path(SETTINGS.COMPRESS_RESULTS)) as sink:
+            def write_page_then_forward(search_term: str, page_metadata: list[ImageRecord]):
+                sink.write_page(search_term, page_metadata)
+                if on_page_scraped:
+                    on_page_scraped(search_term, page_metadata)
+            yield write_page_then_forward
+
+    @staticmethod
+    def write_results_to_json(scrape_results: dict):
+        """
+        Write the Results to file search_results.json for debugging
+        and also in case further analysis is desired. Only used with RESULTS_FORMAT "json".
+        """
+        with open(PATH_TO_RESULTS_JSON, "w") as file:
+            json.dump({
+                search_term: [record.to_dict() for record in records]
+                for search_term, records in scrape_results.items()}, file, indent=2)
+
+
+def get_scraper_backend(name: str) -> type[ScraperBackend]:
+    """
+    Look up a scraper backend by name. Backends are imported here
+    so that only the chosen one's dependencies are loaded.
+    """
+    if name == "selenium":
+        from .redbubble_scraper import ScrapeRedbubble
+        return ScrapeRedbubble
+    if name == "http":
+        from .http_scraper import HttpScrapeRedbubble
+        return HttpScrapeRedbubble
+    raise ValueError(f"Unknown scraper backend: {name}")
@@ -1,5 +1,6 @@
-import requests
-import time
+import asyncio
+
+import httpx
 
 
 def block_for_user_input():
@@ -15,22 +16,30 @@ def block_for_user_input():
         quit()
 
 
-def wait_for_remote_container():
+async def wait_for_remote_webdriver(remote_webdriver_url: str, deadline: float):
     """
-    Unfortunately, despite the depends_on in the docker-compose, sometimes the scraper begins before 
-    remote webdriver is up and ready. Test periodically for the connection.
+    Unfortunately, despite the depends_on in the docker-compose, sometimes the scraper begins before
+    remote webdriver is up and ready. Probe its /status endpoint, backing off from 0.1s to 2s
+    between tries, until it reports ready or deadline seconds have passed.
     """
-    print("Waiting for remote container connection...")
-    iterations = 0
-    while iterations < 20:
-        try:
-            res = requests.get("http://selenium_remote_webdriver:4444")
-            if res.status_code == 200:
-                print("Remote Webdriver connection successful!")
-                time.sleep(1)
-                return
-        except Exception:
-            time.sleep(3)
-            iterations += 1
-    raise RuntimeError(
-        "Unable to connect to webdriver after 20 tries.")
+    print("Waiting for remote webdriver connection...")
+
+    async def probe():
+        delay = 0.1
+        async with httpx.AsyncClient(timeout=2.0) as client:
+            while True:
+                try:
+                    res = await client.get(f"{remote_webdriver_url}/status")
+                    if res.status_code == 200 and res.json().get("value", {}).get("ready", True):
+                        return
+                except (httpx.HTTPError, ValueError):
+                    pass
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 2.0)
+
+    try:
+        await asyncio.wait_for(probe(), timeout=deadline)
+    except asyncio.TimeoutError:
+        raise RuntimeError(
+            f"Remote webdriver at {remote_webdriver_url} was not ready after {deadline} seconds.") from None
+    print("Remote Webdriver connection successful!")
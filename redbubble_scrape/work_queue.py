@@ -0,0 +1,205 @@
+import os
+import socket
+import sqlite3
+import time
+from pathlib import Path
+
+from .config import SETTINGS
+from .schemas import WorkItem
+
+PATH_TO_WORK_QUEUE = Path(os.path.dirname(__file__)) / ".." / "work_queue.sqlite3"
+
+
+def worker_id() -> str:
+    """
+    Names this worker in the queue. In a container the host name is the container ID.
+    """
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class WorkQueue:
+    """
+    A queue of search terms shared by a coordinator and any number of workers,
+    kept in a SQLite file they can all open (e.g. on a shared Docker volume).
+
+    Workers lease one term at a time. A lease lasts lease_seconds and is renewed
+    while the term is being worked on, so if a worker crashes its lease runs out and
+    another worker picks the term up. A term is given up on, and marked failed, once
+    it has been leased max_attempts times without finishing.
+    """
+
+    def __init__(
+            self,
+            path_to_queue: Path = PATH_TO_WORK_QUEUE,
+            lease_seconds: float = 120.0,
+            max_attempts: int = 3):
+        self.path_to_queue = path_to_queue
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        # The default rollback journal rather than WAL, which needs shared memory
+        # and so only works when every worker is on the same host.
+        self.connection = sqlite3.connect(path_to_queue, timeout=30.0, isolation_level=None)
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS work (
+                term TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                worker TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                images INTEGER NOT NULL DEFAULT 0,
+                failures INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                updated_at REAL NOT NULL
+            )
+            """)
+
+    def _transaction(self):
+        """
+        BEGIN IMMEDIATE takes the write lock up front, so two workers
+        can never read the same pending term and both lease it.
+        """
+        self.connection.execute("BEGIN IMMEDIATE")
+        return self.connection
+
+    def put(self, terms: list[str]) -> int:
+        """
+        Queue the search terms. Terms finished by an earlier run are queued again,
+        but a term currently leased is left with its worker. Returns how many were queued.
+        """
+        now = time.time()
+        connection = self._transaction()
+        try:
+            queued = 0
+            for term in terms:
+                queued += connection.execute(
+                    """
+                    INSERT INTO work (term, status, updated_at) VALUES (?, 'pending', ?)
+                    ON CONFLICT(term) DO UPDATE SET
+                        status = 'pending', worker = NULL, lease_expires = NULL, attempts = 0,
+                        images = 0, failures = 0, error = NULL, updated_at = excluded.updated_at
+                    WHERE status != 'leased'
+                    """,
+                    (term, now)).rowcount
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return queued
+
+    def lease(self, worker: str) -> str | None:
+        """
+        Lease the next pending term, or one whose lease has run out, to worker.
+        Returns None when there is nothing to lease right now.
+        """
+        now = time.time()
+        connection = self._transaction()
+        try:
+            connection.execute(
+                """
+                UPDATE work SET status = 'failed', error = 'lease expired', updated_at = ?
+                WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?
+                """,
+                (now, now, self.max_attempts))
+            row = connection.execute(
+                """
+                SELECT term FROM work
+                WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?)
+                ORDER BY rowid LIMIT 1
+                """,
+                (now,)).fetchone()
+            if row is not None:
+                connection.execute(
+                    """
+                    UPDATE work SET status = 'leased', worker = ?, lease_expires = ?,
+                        attempts = attempts + 1, updated_at = ?
+                    WHERE term = ?
+                    """,
+                    (worker, now + self.lease_seconds, now, row[0]))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return row[0] if row else None
+
+    def _update_lease(self, term: str, worker: str, assignments: str, *params) -> bool:
+        """
+        Apply assignments to term only while worker still holds its lease.
+        Returns False if the lease was lost, i.e. it ran out and was taken by another worker.
+        """
+        return self.connection.execute(
+            f"""
+            UPDATE work SET {assignments}, updated_at = ?
+            WHERE term = ? AND worker = ? AND status = 'leased'
+            """,
+            (*params, time.time(), term, worker)).rowcount == 1
+
+    def renew(self, term: str, worker: str) -> bool:
+        return self._update_lease(
+            term, worker, "lease_expires = ?", time.time() + self.lease_seconds)
+
+    def complete(self, term: str, worker: str, images: int, failures: int) -> bool:
+        """
+        Report a finished term, with how many images were saved (downloaded, or already
+        stored by an earlier run) and how many failed.
+        """
+        return self._update_lease(
+            term, worker, "status = 'done', lease_expires = NULL, images = ?, failures = ?",
+            images, failures)
+
+    def fail(self, term: str, worker: str, error: str) -> bool:
+        """
+        Report a term that could not be worked on. It is queued again
+        unless it has already had max_attempts.
+        """
+        return self._update_lease(
+            term, worker,
+            "status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "lease_expires = NULL, error = ?",
+            self.max_attempts, error)
+
+    def release(self, term: str, worker: str) -> bool:
+        """
+        Hand a term back without it counting as an attempt, e.g. when the worker is stopped.
+        """
+        return self._update_lease(
+            term, worker, "status = 'pending', lease_expires = NULL, attempts = attempts - 1")
+
+    def has_unfinished(self) -> bool:
+        """
+        Whether any term is still pending or leased. A leased term may yet
+        come back to the queue if its worker has crashed.
+        """
+        return self.connection.execute(
+            "SELECT 1 FROM work WHERE status IN ('pending', 'leased') LIMIT 1").fetchone() is not None
+
+    def counts(self) -> dict[str, int]:
+        return dict(self.connection.execute(
+            "SELECT status, COUNT(*) FROM work GROUP BY status").fetchall())
+
+    def items(self) -> list[WorkItem]:
+        rows = self.connection.execute(
+            "SELECT term, status, worker, attempts, images, failures, error FROM work ORDER BY rowid")
+        return [
+            WorkItem(
+                term=term,
+                status=status,
+                worker=worker,
+                attempts=attempts,
+                images=images,
+                failures=failures,
+                error=error)
+            for term, status, worker, attempts, images, failures, error in rows]
+
+    def close(self):
+        self.connection.close()
+
+
+def open_work_queue() -> WorkQueue:
+    """
+    The work queue at WORK_QUEUE_PATH, or work_queue.sqlite3 in the repository root.
+    """
+    return WorkQueue(
+        Path(SETTINGS.WORK_QUEUE_PATH) if SETTINGS.WORK_QUEUE_PATH else PATH_TO_WORK_QUEUE,
+        lease_seconds=SETTINGS.WORK_LEASE_SECONDS,
+        max_attempts=SETTINGS.WORK_MAX_ATTEMPTS)
@@ -0,0 +1,169 @@
+from contextlib import ExitStack
+import asyncio
+
+from .config import SETTINGS
+from .download_images import DownloadImages
+from .schemas import ImageRecord
+from .scraper_backend import ScrapeFunction, get_scraper_backend
+from .work_queue import WorkQueue, open_work_queue, worker_id
+
+
+class TermLease:
+    """
+    A search term leased by this worker, and how far its downloads have got.
+    """
+
+    def __init__(self, term: str):
+        self.term = term
+        self.queued = 0
+        self.saved = 0
+        self.failed = 0
+        # Set once every page has been scraped, so no more images will be queued
+        self.scraped = False
+
+    def is_downloaded(self) -> bool:
+        return self.scraped and self.saved + self.failed >= self.queued
+
+
+class Worker:
+    """
+    Leases search terms from the work queue, and scrapes and downloads them
+    until the queue has no pending or leased terms left.
+
+    One scraper session (for Selenium, one pool of browsers) and one downloader
+    (one client, manifest and set of pools) last the worker's whole life, and
+    leased terms are fed through them. Each term's pages go onto the download queue
+    as they are scraped, so the next term is scraped while the last one downloads,
+    and a term is reported done once the last of its images has finished.
+    Up to SCRAPER_SESSIONS terms are scraped at once.
+
+    While other workers hold leases an idle worker waits, in case any of them has crashed.
+    """
+
+    def __init__(self, work_queue: WorkQueue, worker: str | None = None):
+        self.work_queue = work_queue
+        self.worker = worker or worker_id()
+        self.leases: dict[str, TermLease] = {}
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        download_queue: asyncio.Queue = asyncio.Queue(
+            maxsize=SETTINGS.PIPELINE_QUEUE_SIZE)
+
+        def on_page_scraped(search_term: str, page_metadata: list[ImageRecord]):
+            # Called from the scraper threads, so hand over to the event loop and
+            # block until there is room on the queue.
+            asyncio.run_coroutine_threadsafe(
+                self._queue_page(download_queue, search_term, page_metadata), loop).result()
+
+        downloader = DownloadImages(
+            batch_size=SETTINGS.BATCH_SIZE,
+            on_image_done=self._image_done)
+        heartbeat = asyncio.create_task(self._keep_leases())
+        try:
+            await downloader.download_from_queue(
+                download_queue, producer=self._lease_and_scrape(on_page_scraped))
+        finally:
+            heartbeat.cancel()
+            # Anything not finished goes back to the queue for another worker.
+            for term in self.leases:
+                self.work_queue.release(term, self.worker)
+            self.leases.clear()
+        print(f"{self.worker} found no more work: {self.work_queue.counts()}")
+
+    async def _lease_and_scrape(self, on_page_scraped):
+        scraper = get_scraper_backend(SETTINGS.SCRAPER_BACKEND)
+        with ExitStack() as stack:
+            # Opening the session starts the browsers and closing it quits them,
+            # so both happen on a thread.
+            scrape = await asyncio.to_thread(stack.enter_context, scraper.open_session(
+                SETTINGS.MAX_ITEMS_PER_SCRAPE, on_page_scraped, keep_results=False))
+            try:
+                await asyncio.gather(*(
+                    self._lease_loop(scrape) for _ in range(max(SETTINGS.SCRAPER_SESSIONS, 1))))
+            finally:
+                await asyncio.to_thread(stack.close)
+
+    async def _lease_loop(self, scrape: ScrapeFunction):
+        while True:
+            term = self.work_queue.lease(self.worker)
+            if term is None:
+                if not self.work_queue.has_unfinished():
+                    return
+                await asyncio.sleep(SETTINGS.WORK_POLL_INTERVAL)
+                continue
+            print(f"{self.worker} leased => {term}")
+            lease = self.leases[term] = TermLease(term)
+            try:
+                scrape_results = await asyncio.to_thread(scrape, [term])
+            except Exception as exc:
+                self._fail(lease, f"{type(exc).__name__}: {exc}")
+                continue
+            # The scrape function catches a search term's exceptions,
+            # counts them, and leaves the term out of its results.
+            if term not in scrape_results:
+                self._fail(lease, "scrape failed")
+                continue
+            lease.scraped = True
+            self._complete_if_downloaded(lease)
+
+    async def _queue_page(
+            self,
+            download_queue: asyncio.Queue,
+            search_term: str,
+            page_metadata: list[ImageRecord]):
+        lease = self.leases.get(search_term)
+        for record in page_metadata:
+            if lease:
+                lease.queued += 1
+            await download_queue.put((search_term, record))
+
+    def _image_done(self, search_name: str, saved: bool):
+        lease = self.leases.get(search_name)
+        if lease is None:
+            # e.g. a failed download from a previous run, or a term whose lease was lost
+            return
+        if saved:
+            lease.saved += 1
+        else:
+            lease.failed += 1
+        self._complete_if_downloaded(lease)
+
+    def _complete_if_downloaded(self, lease: TermLease):
+        if not lease.is_downloaded() or self.leases.get(lease.term) is not lease:
+            return
+        del self.leases[lease.term]
+        if self.work_queue.complete(lease.term, self.worker, lease.saved, lease.failed):
+            print(f"{lease.term} => done, {lease.saved} images saved, {lease.failed} failed")
+        else:
+            print(f"Lost the lease on => {lease.term}, another worker may have done it too")
+
+    def _fail(self, lease: TermLease, error: str):
+        # Images already queued from its scraped pages still download,
+        # the term is simply not counted as done.
+        if self.leases.pop(lease.term, None) is not lease:
+            return
+        self.work_queue.fail(lease.term, self.worker, error)
+        print(f"{error} while working on => {lease.term}")
+
+    async def _keep_leases(self):
+        """
+        Renew every lease this worker holds every third of the lease time.
+        """
+        while True:
+            await asyncio.sleep(self.work_queue.lease_seconds / 3)
+            for term in list(self.leases):
+                if not self.work_queue.renew(term, self.worker):
+                    print(f"Lost the lease on => {term}, another worker may be working on it too")
+                    self.leases.pop(term, None)
+
+
+async def work():
+    """
+    Run a worker against the work queue until it has no work left.
+    """
+    work_queue = open_work_queue()
+    try:
+        await Worker(work_queue).run()
+    finally:
+        work_queue.close()
@@ -0,0 +1,95 @@
+import unittest
+
+from benchmarks.local_server import PATH_TO_FIXTURES
+from redbubble_scrape.http_scraper import HttpScrapeRedbubble, parse_search_results_page
+from redbubble_scrape.schemas import ImageRecord
+
+
+def fixture_page(name: str = "search_results_page.html", page: int = 1) -> str:
+    return ((PATH_TO_FIXTURES / name).read_text()
+            .replace("{base_url}", "https://cdn.example")
+            .replace("{page}", str(page))
+            .replace("{next_page}", str(page + 1))
+            .replace("{query}", "poster"))
+
+
+class ParseSearchResultsPageTest(unittest.TestCase):
+
+    def test_fixture_tiles(self):
+        tiles = parse_search_results_page(fixture_page())
+
+        self.assertEqual(len(tiles), 40)
+        self.assertEqual(tiles[0], {
+            "price": "$14.99",
+            "texts": ["Space Vintage Classic", "by pixelpusher"],
+            "srcs": ["https://cdn.example/images/p1-0.jpg"],
+            "displayed": True,
+        })
+
+    def test_lazy_image_url_comes_from_data_src(self):
+        tiles = parse_search_results_page(fixture_page())
+
+        # The placeholder src is a data: URI, the real image is in data-src.
+        self.assertEqual(tiles[12]["srcs"], ["https://cdn.example/images/p1-12.jpg"])
+        self.assertEqual(tiles[12]["texts"], ["Club Retro Art", "by retrodesigns"])
+
+    def test_fixture_parses_into_records(self):
+        records = [HttpScrapeRedbubble.parse_tile(tile)
+                   for tile in parse_search_results_page(fixture_page(page=2))]
+
+        self.assertNotIn(None, records)
+        self.assertEqual(len({record.url for record in records}), 40)
+        self.assertEqual(
+            records[0],
+            ImageRecord("Space Vintage Classic", "https://cdn.example/images/p2-0.jpg",
+                        14.99, "$", "by pixelpusher"))
+
+    def test_empty_page_has_no_tiles(self):
+        self.assertEqual(parse_search_results_page(fixture_page("search_results_empty.html")), [])
+
+    def test_only_tiles_inside_the_grid_are_read(self):
+        html = """
+            <a href="/"><span>Redbubble</span></a>
+            <div id="SearchResultsGrid"><div>
+              <a><img srcset="https://cdn.example/a.jpg 1x, https://cdn.example/a-2x.jpg 2x">
+                 <span><span>$9.50</span></span><span>Title <b>with</b> markup</span><span>by someone</span></a>
+            </div></div>
+            <a><span>Footer</span></a>
+        """
+        self.assertEqual(parse_search_results_page(html), [{
+            "price": "$9.50",
+            "texts": ["Title with markup", "by someone"],
+            "srcs": ["https://cdn.example/a.jpg"],
+            "displayed": True,
+        }])
+
+
+class ParseTileTest(unittest.TestCase):
+
+    def tile(self, **overrides) -> dict:
+        return {
+            "price": "$14.99",
+            "texts": ["Space Vintage Classic", "by pixelpusher"],
+            "srcs": ["https://cdn.example/images/p1-0.jpg"],
+            **overrides,
+        }
+
+    def test_valid_tile(self):
+        record = HttpScrapeRedbubble.parse_tile(self.tile())
+
+        self.assertEqual((record.title, record.author, record.price, record.currency),
+                         ("Space Vintage Classic", "by pixelpusher", 14.99, "$"))
+
+    def test_incomplete_tiles_are_dropped(self):
+        for overrides in (
+                {"texts": ["Space Vintage Classic"]},
+                {"texts": ["Space Vintage Classic", "by pixelpusher", "Sale"]},
+                {"srcs": []},
+                {"price": ""},
+                {"price": "Sold out"}):
+            with self.subTest(**overrides):
+                self.assertIsNone(HttpScrapeRedbubble.parse_tile(self.tile(**overrides)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import hashlib
+import os
+import tempfile
+import unittest
+
+from redbubble_scrape.image_store import ContentAddressedStore
+
+
+class ContentAddressedStoreLinkTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path_to_search_folder = Path(self.directory.name) / "space"
+        self.path_to_search_folder.mkdir()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def open_store(self, link_mode: str = "hardlink") -> ContentAddressedStore:
+        return ContentAddressedStore(Path(self.directory.name) / ".blobs", link_mode=link_mode)
+
+    @staticmethod
+    def add_blob(store: ContentAddressedStore, content: bytes) -> Path:
+        path_to_temp_file = store.temp_path()
+        path_to_temp_file.write_bytes(content)
+        return store.add(path_to_temp_file, hashlib.sha256(content).hexdigest(), "jpg")
+
+    def test_identical_bytes_are_stored_once(self):
+        store = self.open_store()
+
+        self.assertEqual(self.add_blob(store, b"poster"), self.add_blob(store, b"poster"))
+        self.assertEqual(list(store.path_to_temp_folder.iterdir()), [])
+
+    def test_linking_the_same_blob_again_reuses_the_name(self):
+        for link_mode in ("hardlink", "symlink", "copy"):
+            with self.subTest(link_mode=link_mode):
+                store = self.open_store(link_mode)
+                path_to_blob = self.add_blob(store, link_mode.encode())
+                path_to_image = self.path_to_search_folder / f"{link_mode}.jpg"
+
+                self.assertEqual(store.link(path_to_blob, path_to_image), path_to_image)
+                self.assertEqual(store.link(path_to_blob, path_to_image), path_to_image)
+                self.assertEqual(path_to_image.read_bytes(), link_mode.encode())
+                self.assertEqual(path_to_image.is_symlink(), link_mode == "symlink")
+
+    def test_a_different_image_with_the_same_name_is_not_overwritten(self):
+        store = self.open_store()
+        first_blob = self.add_blob(store, b"first design")
+        second_blob = self.add_blob(store, b"second design")
+        path_to_image = self.path_to_search_folder / "Title_author.jpg"
+
+        self.assertEqual(store.link(first_blob, path_to_image), path_to_image)
+        second_path = store.link(second_blob, path_to_image)
+
+        self.assertEqual(second_path.name, f"Title_author_{second_blob.stem[:8]}.jpg")
+        self.assertEqual(path_to_image.read_bytes(), b"first design")
+        self.assertEqual(second_path.read_bytes(), b"second design")
+
+    def test_counter_is_added_when_the_hashed_name_is_taken_too(self):
+        store = self.open_store()
+        path_to_blob = self.add_blob(store, b"design")
+        path_to_image = self.path_to_search_folder / "Title_author.jpg"
+        path_to_image.write_bytes(b"something else")
+        path_to_image.with_stem(f"Title_author_{path_to_blob.stem[:8]}").write_bytes(b"another")
+
+        linked_path = store.link(path_to_blob, path_to_image)
+
+        self.assertEqual(linked_path.name, f"Title_author_{path_to_blob.stem[:8]}_2.jpg")
+        self.assertEqual(linked_path.read_bytes(), b"design")
+
+    def test_concurrent_links_to_one_name_all_get_their_own_file(self):
+        store = self.open_store()
+        blobs = [self.add_blob(store, f"design {number}".encode()) for number in range(8)]
+        path_to_image = self.path_to_search_folder / "Title_author.jpg"
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            linked_paths = list(executor.map(lambda blob: store.link(blob, path_to_image), blobs))
+
+        self.assertEqual(len(set(linked_paths)), 8)
+        for path_to_blob, linked_path in zip(blobs, linked_paths):
+            self.assertTrue(os.path.samefile(path_to_blob, linked_path))
+        # No temporary links are left behind
+        self.assertEqual(sorted(self.path_to_search_folder.iterdir()), sorted(linked_paths))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+from pathlib import Path
+from unittest import mock
+import asyncio
+import json
+import tempfile
+import unittest
+
+from redbubble_scrape import download_images
+from redbubble_scrape.config import SETTINGS
+from redbubble_scrape.download_images import DownloadImages
+from redbubble_scrape.retry_queue import RetryQueue
+from redbubble_scrape.schemas import ImageRecord
+
+
+def image_record(number: int) -> ImageRecord:
+    return ImageRecord.from_scraped(
+        f"Design {number}", f"http://127.0.0.1:9/images/{number}.jpg", "$19.99", "artist")
+
+
+class RetryQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path_to_queue = Path(self.directory.name) / "failed_downloads.jsonl"
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_failures(self, count: int):
+        previous_run = RetryQueue(self.path_to_queue)
+        for number in range(count):
+            previous_run.add("cats", image_record(number), TimeoutError("timed out"))
+        previous_run.save()
+
+    def saved_urls(self) -> list[str]:
+        with open(self.path_to_queue, "r") as file:
+            return [json.loads(line)["metadata"]["url"] for line in file]
+
+    def test_round_trip(self):
+        self.write_failures(2)
+
+        loaded = RetryQueue(self.path_to_queue).load()
+        self.assertEqual(loaded, [("cats", image_record(0)), ("cats", image_record(1))])
+
+    def test_save_keeps_outstanding_items_and_new_failures(self):
+        self.write_failures(3)
+        retry_queue = RetryQueue(self.path_to_queue)
+        (_, downloaded), (_, failed_again), _ = retry_queue.load()
+
+        retry_queue.finish(downloaded)
+        retry_queue.finish(failed_again)
+        retry_queue.add("cats", failed_again, TimeoutError("timed out"))
+        retry_queue.add("dogs", image_record(3), TimeoutError("timed out"))
+        retry_queue.save()
+
+        self.assertEqual(sorted(self.saved_urls()), [image_record(number).url for number in (1, 2, 3)])
+
+    def test_save_removes_the_file_once_everything_is_done(self):
+        self.write_failures(2)
+        retry_queue = RetryQueue(self.path_to_queue)
+        for _, image_metadata in retry_queue.load():
+            retry_queue.finish(image_metadata)
+        retry_queue.save()
+
+        self.assertFalse(self.path_to_queue.exists())
+
+    def test_interrupted_download_keeps_the_loaded_items(self):
+        self.write_failures(20)
+
+        async def failing_producer():
+            raise TimeoutError("webdriver never came up")
+
+        with mock.patch.object(SETTINGS, "USE_DOWNLOAD_MANIFEST", False), \
+                mock.patch.object(SETTINGS, "PERSIST_FAILED_DOWNLOADS", True), \
+                mock.patch.object(
+                    download_images, "RetryQueue", lambda: RetryQueue(self.path_to_queue)):
+            with self.assertRaises(TimeoutError):
+                asyncio.run(DownloadImages().download_from_queue(
+                    asyncio.Queue(), producer=failing_producer()))
+
+        self.assertEqual(self.saved_urls(), [image_record(number).url for number in range(20)])
+
+
+if __name__ == "__main__":
+    unittest.main()
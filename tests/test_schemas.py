@@ -0,0 +1,81 @@
+import unittest
+
+from redbubble_scrape.metrics import METRICS
+from redbubble_scrape.schemas import ImageRecord, ScraperResults, parse_price
+
+
+class ParsePriceTest(unittest.TestCase):
+
+    def test_prices(self):
+        for price_text, expected in (
+                ("$14.99", (14.99, "$")),
+                ("US$ 14.99", (14.99, "US$")),
+                ("14,99 €", (14.99, "€")),
+                ("$1,299.00", (1299.0, "$")),
+                ("1.299,00 €", (1299.0, "€")),
+                ("1,299", (1299.0, "")),
+                ("£5", (5.0, "£"))):
+            with self.subTest(price_text=price_text):
+                self.assertEqual(parse_price(price_text), expected)
+
+    def test_unparseable_price(self):
+        for price_text in ("Sold out", "", "$"):
+            with self.subTest(price_text=price_text):
+                with self.assertRaises(ValueError):
+                    parse_price(price_text)
+
+
+class ImageRecordTest(unittest.TestCase):
+
+    def metadata(self, **overrides) -> dict:
+        return {
+            "title": "Space Vintage Classic",
+            "url": "https://cdn.example/images/p1-0.jpg",
+            "price": "$14.99",
+            "author": "by pixelpusher",
+            **overrides,
+        }
+
+    def test_dict_round_trip(self):
+        for price in ("$14.99", "14,99 €", "$1,299.00"):
+            with self.subTest(price=price):
+                record = ImageRecord.from_dict(self.metadata(price=price))
+                self.assertEqual(ImageRecord.from_dict(record.to_dict()), record)
+
+    def test_price_is_written_back_normalized(self):
+        record = ImageRecord.from_dict(self.metadata(price="$1,299.00"))
+
+        self.assertEqual((record.price, record.currency), (1299.0, "$"))
+        self.assertEqual(record.to_dict()["price"], "$1299.00")
+
+    def test_invalid_metadata_raises(self):
+        for image_metadata in (
+                self.metadata(price="Sold out"),
+                self.metadata(title=None),
+                {key: value for key, value in self.metadata().items() if key != "url"},
+                ["not", "a", "dict"]):
+            with self.subTest(image_metadata=image_metadata):
+                with self.assertRaises(ValueError):
+                    ImageRecord.from_dict(image_metadata)
+
+    def test_invalid_metadata_is_counted_and_skipped(self):
+        before = METRICS.counters.get("invalid_records_total", 0)
+
+        self.assertIsNone(ImageRecord.from_dict_or_none(self.metadata(price="Sold out")))
+        self.assertEqual(METRICS.counters.get("invalid_records_total", 0), before + 1)
+
+    def test_scraper_results_drop_invalid_records(self):
+        scraper_results = ScraperResults(results={
+            "space": [self.metadata(), self.metadata(price="Sold out")]})
+
+        self.assertEqual(scraper_results.to_records(), {"space": [ImageRecord.from_dict(self.metadata())]})
+
+    def test_file_name_is_sanitized(self):
+        record = ImageRecord.from_dict(self.metadata(
+            title="Star Wars: A New/Hope!", author="by jo.e", url="https://cdn.example/i.123.jpg"))
+
+        self.assertEqual(record.file_name, "Star Wars_ A New_Hope__by jo_e.jpg")
+
+
+if __name__ == "__main__":
+    unittest.main()
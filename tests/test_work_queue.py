@@ -0,0 +1,132 @@
+from pathlib import Path
+import tempfile
+import time
+import unittest
+
+from redbubble_scrape.work_queue import WorkQueue
+
+
+class WorkQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.queues: list[WorkQueue] = []
+
+    def tearDown(self):
+        for work_queue in self.queues:
+            work_queue.close()
+        self.directory.cleanup()
+
+    def open_queue(self, lease_seconds: float = 60.0, max_attempts: int = 3) -> WorkQueue:
+        work_queue = WorkQueue(
+            Path(self.directory.name) / "work_queue.sqlite3",
+            lease_seconds=lease_seconds,
+            max_attempts=max_attempts)
+        self.queues.append(work_queue)
+        return work_queue
+
+    def test_terms_are_leased_once_in_order(self):
+        work_queue = self.open_queue()
+        self.assertEqual(work_queue.put(["a", "b"]), 2)
+
+        self.assertEqual(work_queue.lease("worker-1"), "a")
+        self.assertEqual(work_queue.lease("worker-2"), "b")
+        self.assertIsNone(work_queue.lease("worker-3"))
+        self.assertEqual(work_queue.counts(), {"leased": 2})
+
+    def test_lease_is_shared_between_connections(self):
+        coordinator = self.open_queue()
+        coordinator.put(["a"])
+
+        self.assertEqual(self.open_queue().lease("worker-1"), "a")
+        self.assertIsNone(self.open_queue().lease("worker-2"))
+
+    def test_complete_records_the_result(self):
+        work_queue = self.open_queue()
+        work_queue.put(["a"])
+        work_queue.lease("worker-1")
+
+        self.assertTrue(work_queue.complete("a", "worker-1", images=10, failures=2))
+        [item] = work_queue.items()
+        self.assertEqual(
+            (item.status, item.worker, item.attempts, item.images, item.failures),
+            ("done", "worker-1", 1, 10, 2))
+        self.assertFalse(work_queue.has_unfinished())
+
+    def test_expired_lease_is_taken_by_another_worker(self):
+        work_queue = self.open_queue(lease_seconds=0.05)
+        work_queue.put(["a"])
+        work_queue.lease("worker-1")
+        self.assertIsNone(work_queue.lease("worker-2"))
+
+        time.sleep(0.1)
+        self.assertEqual(work_queue.lease("worker-2"), "a")
+        self.assertEqual(work_queue.items()[0].attempts, 2)
+
+        # The first worker has lost its lease, so none of its updates apply
+        self.assertFalse(work_queue.renew("a", "worker-1"))
+        self.assertFalse(work_queue.complete("a", "worker-1", images=1, failures=0))
+        self.assertFalse(work_queue.fail("a", "worker-1", "too late"))
+        self.assertTrue(work_queue.complete("a", "worker-2", images=1, failures=0))
+        self.assertEqual(work_queue.items()[0].worker, "worker-2")
+
+    def test_renewed_lease_does_not_expire(self):
+        work_queue = self.open_queue(lease_seconds=0.2)
+        work_queue.put(["a"])
+        work_queue.lease("worker-1")
+
+        for _ in range(3):
+            time.sleep(0.1)
+            self.assertTrue(work_queue.renew("a", "worker-1"))
+        self.assertIsNone(work_queue.lease("worker-2"))
+
+    def test_failed_term_is_retried_until_max_attempts(self):
+        work_queue = self.open_queue(max_attempts=2)
+        work_queue.put(["a"])
+
+        work_queue.lease("worker-1")
+        self.assertTrue(work_queue.fail("a", "worker-1", "scrape failed"))
+        self.assertEqual(work_queue.counts(), {"pending": 1})
+
+        self.assertEqual(work_queue.lease("worker-2"), "a")
+        self.assertTrue(work_queue.fail("a", "worker-2", "scrape failed"))
+        self.assertEqual(work_queue.counts(), {"failed": 1})
+        self.assertIsNone(work_queue.lease("worker-3"))
+        self.assertEqual(work_queue.items()[0].error, "scrape failed")
+
+    def test_expired_lease_fails_after_max_attempts(self):
+        work_queue = self.open_queue(lease_seconds=0.05, max_attempts=2)
+        work_queue.put(["a"])
+
+        for worker in ("worker-1", "worker-2"):
+            self.assertEqual(work_queue.lease(worker), "a")
+            time.sleep(0.1)
+
+        self.assertIsNone(work_queue.lease("worker-3"))
+        [item] = work_queue.items()
+        self.assertEqual((item.status, item.attempts, item.error), ("failed", 2, "lease expired"))
+
+    def test_release_does_not_count_as_an_attempt(self):
+        work_queue = self.open_queue(max_attempts=1)
+        work_queue.put(["a"])
+        work_queue.lease("worker-1")
+
+        self.assertTrue(work_queue.release("a", "worker-1"))
+        self.assertEqual(work_queue.items()[0].attempts, 0)
+        self.assertEqual(work_queue.lease("worker-2"), "a")
+
+    def test_put_requeues_finished_terms_but_not_leased_ones(self):
+        work_queue = self.open_queue()
+        work_queue.put(["a", "b"])
+        work_queue.lease("worker-1")
+        work_queue.complete("a", "worker-1", images=1, failures=0)
+        work_queue.lease("worker-1")
+
+        self.assertEqual(work_queue.put(["a", "b", "c"]), 2)
+        statuses = {item.term: (item.status, item.attempts) for item in work_queue.items()}
+        self.assertEqual(
+            statuses, {"a": ("pending", 0), "b": ("leased", 1), "c": ("pending", 0)})
+
+
+if __name__ == "__main__":
+    unittest.main()